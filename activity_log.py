@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FLUSH_INTERVAL = 1.0
+FLUSH_RECORDS = 1000
+MAX_BYTES = 50 * 1024 * 1024
+BACKUP_COUNT = 5
+
+def rotate_file(path, backup_count):
+    # <name> -> <name>.1.gz, <name>.1.gz -> <name>.2.gz, ...
+    # Imported here: rotation is rare and gzip pulls in zlib, bz2 and lzma
+    import gzip
+    import shutil
+    for i in range(backup_count - 1, 0, -1):
+        older = f"{path}.{i}.gz"
+        if os.path.exists(older):
+            os.replace(older, f"{path}.{i + 1}.gz")
+    with open(path, "rb") as src, gzip.open(f"{path}.1.gz.tmp", "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(f"{path}.1.gz.tmp", f"{path}.1.gz")
+    os.remove(path)
+
+class ActivityLog:
+    # One sink per run: records are buffered in memory and written to
+    # <base>.txt (human readable) and <base>.jsonl (structured) in batches,
+    # by count or every flush_interval seconds, whichever comes first.
+    def __init__(self, base_path, flush_interval=FLUSH_INTERVAL, flush_records=FLUSH_RECORDS,
+                 max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        self.text_path = base_path + ".txt"
+        self.json_path = base_path + ".jsonl"
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self.buffer = []
+        self.files = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.last_second = None
+        self.second_prefix = ""
+
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def write(self, message, **fields):
+        record = (time.time(), message, fields)
+        with self.lock:
+            self.buffer.append(record)
+            full = len(self.buffer) >= self.flush_records
+        if full:
+            self.flush()
+
+    def flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def timestamp(self, t):
+        # Same text as str(datetime.now()), but strftime only runs once per second
+        second = int(t)
+        if second != self.last_second:
+            self.last_second = second
+            self.second_prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return f"{self.second_prefix}.{int((t - second) * 1000000):06d}"
+
+    def flush(self):
+        # The batch is taken while holding write_lock, so a size-triggered
+        # flush can't write its records ahead of an earlier batch still being written
+        with self.write_lock:
+            with self.lock:
+                records, self.buffer = self.buffer, []
+            if not records:
+                return
+
+            text_lines = []
+            json_lines = []
+            for t, message, fields in records:
+                stamp = self.timestamp(t)
+                text_lines.append(f"{stamp} - {message}\n")
+                json_lines.append(json.dumps({"ts": stamp, "msg": message, **fields}, ensure_ascii=False) + "\n")
+
+            self.append(self.text_path, "".join(text_lines))
+            self.append(self.json_path, "".join(json_lines))
+
+    def open_locked(self, path):
+        # Other jobs may log for the same user; hold the file while appending
+        # and follow it if one of them rotated it away in the meantime
+        while True:
+            f = self.files.get(path)
+            if f is None:
+                f = self.files[path] = open(path, "a", encoding="utf-8")
+            if fcntl is None:
+                return f
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            f.close()
+            del self.files[path]
+
+    def append(self, path, data):
+        f = self.open_locked(path)
+        try:
+            f.write(data)
+            # Hand the batch to the OS right away, a crash loses at most one interval
+            f.flush()
+            if self.max_bytes and f.tell() >= self.max_bytes:
+                rotate_file(path, self.backup_count)
+                f.close()
+                del self.files[path]
+        finally:
+            if not f.closed and fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def close(self):
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+        with self.write_lock:
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
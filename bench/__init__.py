@@ -0,0 +1,7 @@
+# Benchmarks for the organize, backup, undo and log paths against seeded
+# synthetic trees. Run with `python -m bench run ...`, see bench/__main__.py.
+from bench.tree import TreeSpec, generate_tree
+from bench.runner import run_benchmark
+from bench.compare import compare_results
+
+__all__ = ["TreeSpec", "generate_tree", "run_benchmark", "compare_results"]
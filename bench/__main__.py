@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import argparse
+
+from bench.tree import REFERENCE_TIME, TreeSpec, generate_tree
+from bench.runner import run_benchmark
+from bench.compare import compare_results, format_comparison
+
+# python -m bench run --files 100000 --seed 1 --depth 2 --collisions 0.05 -o results.json
+# python -m bench compare baseline.json results.json
+# python -m bench generate /tmp/tree --files 10000
+
+def spec_from_args(args):
+    extensions = None
+    if args.extensions:
+        # ".jpg=30,.pdf=10,=2"
+        extensions = {}
+        for item in args.extensions.split(","):
+            ext, _, weight = item.partition("=")
+            extensions[ext.strip()] = float(weight or 1)
+    return TreeSpec(files=args.files, seed=args.seed, extensions=extensions, median_size=args.median_size,
+                    size_sigma=args.size_sigma, max_size=args.max_size, collisions=args.collisions,
+                    depth=args.depth, fanout=args.fanout, reference_time=args.reference_time)
+
+def add_tree_options(parser):
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extensions", help="weighted mix, e.g. .jpg=30,.pdf=10,=2")
+    parser.add_argument("--median-size", type=int, default=32 * 1024)
+    parser.add_argument("--size-sigma", type=float, default=1.5)
+    parser.add_argument("--max-size", type=int, default=64 * 1024 * 1024)
+    parser.add_argument("--collisions", type=float, default=0.0, help="fraction of names already taken")
+    parser.add_argument("--depth", type=int, default=0)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--reference-time", type=float, default=REFERENCE_TIME,
+                        help="newest file mtime, as a Unix timestamp")
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate a tree and time every phase")
+    add_tree_options(run)
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--workdir", help="where temp trees go (default: system temp dir)")
+    run.add_argument("--keep", action="store_true", help="leave the temp trees behind")
+    run.add_argument("-o", "--output", help="write results JSON here (default: stdout)")
+    run.add_argument("--baseline", help="compare against this results file when done")
+
+    compare = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, help="allowed slowdown for timings, e.g. 0.1")
+
+    generate = commands.add_parser("generate", help="only write a synthetic tree")
+    generate.add_argument("path")
+    add_tree_options(generate)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        files, nbytes = generate_tree(os.path.abspath(args.path), spec_from_args(args))
+        print(f"{files} files, {nbytes / 1048576:.1f} MB in {args.path}")
+        return 0
+
+    thresholds = None
+    if args.command == "compare":
+        baseline, current = load(args.baseline), load(args.current)
+        if args.threshold is not None:
+            thresholds = {"seconds": args.threshold}
+    else:
+        current = run_benchmark(spec_from_args(args), args.repeat, args.workdir, args.keep)
+        text = json.dumps(current, indent=1)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        if not args.baseline:
+            return 0
+        baseline = load(args.baseline)
+
+    rows, warnings = compare_results(baseline, current, thresholds)
+    # Keep stdout clean when the results JSON went there
+    out = sys.stderr if args.command == "run" and not args.output else sys.stdout
+    print(format_comparison(rows, warnings), file=out)
+    return 1 if any(row[5] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
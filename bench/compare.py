@@ -0,0 +1,43 @@
+# Which numbers count as a regression, and by how much they may grow before
+# they are flagged. Timings below the floor are too noisy to judge. Syscall
+# counts are reported but not judged: SQLite's page writes alone make syscw
+# swing several-fold between identical runs.
+CHECKS = {
+    "seconds": 0.10,
+    "peak_rss_kb": 0.20,
+}
+MIN_SECONDS = 0.05
+
+def compare_results(baseline, current, thresholds=None, min_seconds=MIN_SECONDS):
+    # -> (rows, warnings); a row is (phase, metric, old, new, ratio, regressed)
+    thresholds = dict(CHECKS, **(thresholds or {}))
+    warnings = []
+    if baseline.get("spec") != current.get("spec"):
+        warnings.append("Tree specs differ, results are not directly comparable")
+    if baseline.get("environment") != current.get("environment"):
+        warnings.append("Environment differs from the baseline")
+
+    rows = []
+    for phase, old in baseline["phases"].items():
+        new = current["phases"].get(phase)
+        if new is None:
+            warnings.append(f"Phase {phase} is missing from the current results")
+            continue
+        for metric, allowed in thresholds.items():
+            if metric not in old or metric not in new:
+                continue
+            old_value, new_value = old[metric], new[metric]
+            ratio = new_value / old_value if old_value else None
+            regressed = ratio is not None and ratio > 1 + allowed
+            if metric == "seconds" and max(old_value, new_value) < min_seconds:
+                regressed = False
+            rows.append((phase, metric, old_value, new_value, ratio, regressed))
+    return rows, warnings
+
+def format_comparison(rows, warnings):
+    lines = [f"warning: {w}" for w in warnings]
+    for phase, metric, old, new, ratio, regressed in rows:
+        change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else "n/a"
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{phase:<10} {metric:<12} {old:>14} {new:>14} {change:>9}{flag}")
+    return "\n".join(lines)
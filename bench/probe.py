@@ -0,0 +1,75 @@
+import os
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# What a phase cost beyond wall time. Every counter is optional: fields the
+# platform can't provide are left out rather than reported as zero.
+PROC_IO = "/proc/self/io"
+PROC_STATUS = "/proc/self/status"
+RUSAGE_FIELDS = ("ru_minflt", "ru_majflt", "ru_nvcsw", "ru_nivcsw", "ru_inblock", "ru_oublock")
+
+def read_proc_io():
+    # syscr/syscw count read- and write-type syscalls for the whole process
+    try:
+        with open(PROC_IO) as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+def reset_peak_rss():
+    # Linux 4.0+: writing 5 to clear_refs resets VmHWM, so each phase gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_kb():
+    try:
+        with open(PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, KiB elsewhere
+        return peak // 1024 if os.uname().sysname == "Darwin" else peak
+    return None
+
+class Measure:
+    def __init__(self):
+        self.result = {}
+
+    def __enter__(self):
+        self.peak_reset = reset_peak_rss()
+        self.io = read_proc_io()
+        self.usage = resource.getrusage(resource.RUSAGE_SELF) if resource is not None else None
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        result = {"seconds": round(wall, 6), "cpu_seconds": round(time.process_time() - self.cpu, 6)}
+        peak = peak_rss_kb()
+        if peak is not None:
+            # Without a reset this is the process peak so far, say so
+            result["peak_rss_kb"] = peak
+            result["peak_rss_scope"] = "phase" if self.peak_reset else "process"
+        io = read_proc_io()
+        for key in ("syscr", "syscw", "rchar", "wchar", "read_bytes", "write_bytes"):
+            if key in io and key in self.io:
+                result[key] = io[key] - self.io[key]
+        if self.usage is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            for key in RUSAGE_FIELDS:
+                result[key[3:]] = getattr(usage, key) - getattr(self.usage, key)
+        self.result = result
+        return False
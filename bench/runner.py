@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import shutil
+import platform
+import tempfile
+
+import organizer
+from metrics import RunMetrics
+from log_view import LogIndex
+from bench.tree import generate_tree
+from bench.probe import Measure
+
+RESULTS_VERSION = 1
+BENCH_USER = "bench"
+# In the order they run; undo needs the organize run before it
+PHASES = ("backup", "organize", "load_log", "undo")
+
+# Lines the log screen shows at once
+LOG_PAGE = 50
+
+def read_log(username):
+    # What the log screen does on open: index the file, then decode the last page
+    log_file = os.path.join(organizer.DATA_DIR, "logs", f"{username}_log.txt")
+    with LogIndex(log_file) as index:
+        index.refresh()
+        return len(index.lines(max(0, len(index) - LOG_PAGE), LOG_PAGE))
+
+def run_once(spec, workdir):
+    tree = os.path.join(workdir, "tree")
+    started = time.perf_counter()
+    files, nbytes = generate_tree(tree, spec)
+    generate_seconds = time.perf_counter() - started
+    recursive = spec.depth > 0
+
+    results = {}
+    cwd = os.getcwd()
+    # The organizer keeps its data/ next to the working directory
+    os.chdir(workdir)
+    try:
+        organizer.ensure_data_dirs()
+        with Measure() as m:
+            organizer.backup_folder(BENCH_USER, tree, recursive=recursive)
+        results["backup"] = m.result
+
+        metrics = RunMetrics()
+        with Measure() as m:
+            summary = organizer.organize_folder(BENCH_USER, tree, recursive=recursive, metrics=metrics)
+        results["organize"] = m.result
+        results["organize"]["moved"] = sum(summary.values())
+        # Where the organize time went, from the run's own metrics
+        results["organize"]["phases"] = {phase: stats["elapsed"]
+                                         for phase, stats in metrics.snapshot()["phases"].items()}
+
+        with Measure() as m:
+            read_log(BENCH_USER)
+        results["load_log"] = m.result
+
+        run = organizer.list_runs(BENCH_USER)[-1]
+        with Measure() as m:
+            restored = organizer.undo_run(BENCH_USER, run["run"])
+        results["undo"] = m.result
+        results["undo"]["restored"] = restored
+    finally:
+        os.chdir(cwd)
+    for result in results.values():
+        if result["seconds"] > 0:
+            result["files_per_s"] = round(files / result["seconds"], 1)
+    return {"files": files, "bytes": nbytes, "generate_seconds": round(generate_seconds, 3), "phases": results}
+
+def best_of(runs):
+    # Fastest repeat per phase; other counters come from that same repeat
+    best = {}
+    for run in runs:
+        for phase, result in run["phases"].items():
+            if phase not in best or result["seconds"] < best[phase]["seconds"]:
+                best[phase] = result
+    return best
+
+def run_benchmark(spec, repeat=1, workdir=None, keep=False):
+    runs = []
+    for _ in range(repeat):
+        # Same seed, same tree: every repeat starts from an identical state
+        tmp = tempfile.mkdtemp(prefix="organizer-bench-", dir=workdir)
+        try:
+            runs.append(run_once(spec, tmp))
+        finally:
+            if not keep:
+                shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "spec": spec.to_dict(),
+        "repeat": repeat,
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "phases": best_of(runs),
+        "runs": runs,
+    }
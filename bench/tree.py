@@ -0,0 +1,98 @@
+import os
+import math
+import random
+
+# Rough mix of a downloads folder; "" is files without an extension and
+# the unknown ones land in Others.
+DEFAULT_EXTENSIONS = {
+    ".jpg": 25, ".png": 8, ".gif": 2, ".pdf": 10, ".docx": 5, ".txt": 8, ".csv": 3,
+    ".mp4": 3, ".mov": 1, ".mp3": 5, ".flac": 1, ".zip": 4, ".gz": 2,
+    ".py": 4, ".json": 4, ".dat": 5, "": 3,
+}
+
+# Bytes shared by every generated file; each file starts with its own index,
+# so contents are still unique and the backup store can't dedupe them away.
+NOISE_SIZE = 4 * 1024 * 1024
+# mtimes count back from here rather than from the clock, so a tree lands in
+# the same year/month folders whenever it is generated (2023-11-14 22:13 UTC)
+REFERENCE_TIME = 1700000000
+
+class TreeSpec:
+    def __init__(self, files=1000, seed=0, extensions=None, median_size=32 * 1024, size_sigma=1.5,
+                 max_size=64 * 1024 * 1024, collisions=0.0, depth=0, fanout=4, age_days=3 * 365,
+                 reference_time=REFERENCE_TIME):
+        self.files = files
+        self.seed = seed
+        self.extensions = dict(extensions or DEFAULT_EXTENSIONS)
+        # Sizes are log-normal around the median, clamped to max_size
+        self.median_size = median_size
+        self.size_sigma = size_sigma
+        self.max_size = max_size
+        # Fraction of files whose destination name is already taken
+        self.collisions = collisions
+        self.depth = depth
+        self.fanout = fanout
+        self.age_days = age_days
+        # Newest possible mtime; files are spread over age_days before it
+        self.reference_time = reference_time
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+def directories(root, depth, fanout):
+    dirs = [root]
+    level = [root]
+    for d in range(depth):
+        level = [os.path.join(parent, f"dir{d}_{i}") for parent in level for i in range(fanout)]
+        dirs.extend(level)
+    return dirs
+
+def generate_tree(root, spec):
+    # Returns (files written, bytes written). The same spec and seed always
+    # give the same names, sizes, mtimes and contents.
+    from organizer import destination_parts
+
+    rng = random.Random(spec.seed)
+    noise = rng.randbytes(NOISE_SIZE)
+    exts = list(spec.extensions)
+    weights = [spec.extensions[e] for e in exts]
+    dirs = directories(root, spec.depth, spec.fanout)
+    for path in dirs:
+        os.makedirs(path, exist_ok=True)
+
+    total = 0
+    mu = math.log(spec.median_size)
+    for i in range(spec.files):
+        ext = rng.choices(exts, weights)[0]
+        name = f"file_{i:07d}{ext}"
+        path = os.path.join(rng.choice(dirs), name)
+        size = min(spec.max_size, int(rng.lognormvariate(mu, spec.size_sigma)))
+        with open(path, "wb") as f:
+            prefix = i.to_bytes(8, "little")
+            f.write(prefix[:size])
+            remaining = size - len(prefix[:size])
+            offset = rng.randrange(NOISE_SIZE)
+            while remaining > 0:
+                chunk = noise[offset:offset + remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+        mtime = spec.reference_time - rng.random() * spec.age_days * 86400
+        os.utime(path, (mtime, mtime))
+        total += size
+
+        if rng.random() < spec.collisions:
+            # Put a same-named file where this one is going to be moved
+            st = os.stat(path)
+            parts = destination_parts(name, st)
+            dest_dir = os.path.join(root, *parts)
+            os.makedirs(dest_dir, exist_ok=True)
+            taken = os.path.join(dest_dir, name)
+            with open(taken, "wb") as f:
+                f.write(b"taken")
+            os.utime(taken, (spec.reference_time, spec.reference_time))
+    return spec.files, total
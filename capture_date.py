@@ -0,0 +1,220 @@
+import os
+import time
+import struct
+import governor
+
+# When a photo or video was taken, from the metadata inside the file: EXIF
+# DateTimeOriginal for JPEG and TIFF-based images, the movie header (mvhd)
+# creation time for MP4/MOV. Only header bytes are read, with a cap on the
+# number of reads per file, so a damaged file costs no more than a good one.
+# Everything else, or a file without the tag, is dated by its file times.
+EXIF_EXTENSIONS = {".jpg", ".jpeg", ".tif", ".tiff", ".dng", ".nef", ".cr2", ".arw"}
+QUICKTIME_EXTENSIONS = {".mp4", ".mov", ".m4v", ".3gp"}
+
+# The first read covers the EXIF block of nearly every camera JPEG
+HEAD_BYTES = 16 * 1024
+MAX_READS = 32
+MAX_SEGMENTS = 32
+MAX_BOXES = 64
+MAX_IFD_ENTRIES = 1024
+
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TYPE_ASCII = 2
+TYPE_LONG = 4
+
+# Version of the answers kept in the date cache, bumped when parsing changes
+PARSE_VERSION = 1
+
+# QuickTime counts seconds from 1904-01-01 UTC
+MAC_EPOCH_OFFSET = 2082844800
+
+class HeaderReader:
+    # The first HEAD_BYTES come from one read; anything past them is a
+    # positioned read of its own and counts against MAX_READS
+    def __init__(self, fd):
+        self.fd = fd
+        self.reads = 0
+        self.head = self.pread(0, HEAD_BYTES)
+
+    def pread(self, offset, size):
+        self.reads += 1
+        if self.reads > MAX_READS:
+            raise ValueError("Too many header reads")
+        with governor.current().io(size):
+            if hasattr(os, "pread"):
+                return os.pread(self.fd, size, offset)
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            return os.read(self.fd, size)
+
+    def read(self, offset, size):
+        if offset + size <= len(self.head):
+            data = self.head[offset:offset + size]
+        else:
+            data = self.pread(offset, size)
+        if len(data) < size:
+            raise ValueError("Truncated header")
+        return data
+
+def parse_exif_datetime(text):
+    # "YYYY:MM:DD HH:MM:SS" in the camera's local time; blank or zeroed when the clock wasn't set
+    try:
+        year, month, day = int(text[0:4]), int(text[5:7]), int(text[8:10])
+        hour, minute, second = int(text[11:13]), int(text[14:16]), int(text[17:19])
+    except ValueError:
+        return None
+    if year < 1970 or not 1 <= month <= 12 or not 1 <= day <= 31:
+        return None
+    try:
+        return time.mktime((year, month, day, hour, minute, second, 0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+def read_ifd(reader, base, offset, order, wanted):
+    # {tag: (type, count, 4 value-or-offset bytes)} for the wanted tags of one IFD
+    count = struct.unpack(order + "H", reader.read(base + offset, 2))[0]
+    if count > MAX_IFD_ENTRIES:
+        raise ValueError("Implausible IFD")
+    data = reader.read(base + offset + 2, count * 12)
+    tags = {}
+    for i in range(0, len(data), 12):
+        tag, kind, n = struct.unpack(order + "HHI", data[i:i + 8])
+        if tag in wanted:
+            tags[tag] = (kind, n, data[i + 8:i + 12])
+    return tags
+
+def ifd_date(reader, base, order, tags, tag):
+    entry = tags.get(tag)
+    if entry is None or entry[0] != TYPE_ASCII or entry[1] < 19:
+        return None
+    # 20 bytes never fit inline, the field is an offset from the TIFF header
+    offset = struct.unpack(order + "I", entry[2])[0]
+    return parse_exif_datetime(reader.read(base + offset, 19).decode("ascii", errors="replace"))
+
+def exif_date(reader, base=0):
+    # base is where the TIFF header starts: 0 for TIFF files, inside APP1 for JPEG
+    header = reader.read(base, 8)
+    if header[:2] == b"II":
+        order = "<"
+    elif header[:2] == b"MM":
+        order = ">"
+    else:
+        return None
+    magic, ifd0 = struct.unpack(order + "HI", header[2:8])
+    if magic != 42:
+        return None
+    tags = read_ifd(reader, base, ifd0, order, (TAG_DATETIME, TAG_EXIF_IFD))
+    exif = tags.get(TAG_EXIF_IFD)
+    if exif is not None and exif[0] == TYPE_LONG:
+        sub = read_ifd(reader, base, struct.unpack(order + "I", exif[2])[0], order,
+                       (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED))
+        taken = (ifd_date(reader, base, order, sub, TAG_DATETIME_ORIGINAL)
+                 or ifd_date(reader, base, order, sub, TAG_DATETIME_DIGITIZED))
+        if taken is not None:
+            return taken
+    # Last modified in camera or editor; better than a file time
+    return ifd_date(reader, base, order, tags, TAG_DATETIME)
+
+def jpeg_date(reader):
+    if reader.read(0, 2) != b"\xff\xd8":
+        return None
+    pos = 2
+    for _ in range(MAX_SEGMENTS):
+        marker, kind, length = struct.unpack(">BBH", reader.read(pos, 4))
+        # Start of scan or end of image: the metadata segments are all before it
+        if marker != 0xFF or kind in (0xDA, 0xD9):
+            return None
+        if kind == 0xE1 and reader.read(pos + 4, 6) == b"Exif\x00\x00":
+            return exif_date(reader, pos + 10)
+        pos += 2 + length
+    return None
+
+def find_box(reader, start, end, kind):
+    # (payload start, end) of the first box of this kind between start and end
+    pos = start
+    for _ in range(MAX_BOXES):
+        if pos + 8 > end:
+            return None
+        size, box_type = struct.unpack(">I4s", reader.read(pos, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", reader.read(pos + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return None
+        if box_type == kind:
+            return pos + header, min(pos + size, end)
+        # mdat is skipped by its size, a moov at the end costs one read per box
+        pos += size
+    return None
+
+def quicktime_date(reader, file_size):
+    moov = find_box(reader, 0, file_size, b"moov")
+    if moov is None:
+        return None
+    mvhd = find_box(reader, moov[0], moov[1], b"mvhd")
+    if mvhd is None:
+        return None
+    version = reader.read(mvhd[0], 1)[0]
+    if version == 1:
+        created = struct.unpack(">Q", reader.read(mvhd[0] + 4, 8))[0]
+    else:
+        created = struct.unpack(">I", reader.read(mvhd[0] + 4, 4))[0]
+    # Zero means not set; the value is UTC
+    if created <= MAC_EPOCH_OFFSET:
+        return None
+    return float(created - MAC_EPOCH_OFFSET)
+
+def embedded_date(path, st):
+    ext = os.path.splitext(path)[1].lower()
+    with governor.current().operation():
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            reader = HeaderReader(fd)
+            if ext in QUICKTIME_EXTENSIONS:
+                return quicktime_date(reader, st.st_size)
+            if reader.head[:2] == b"\xff\xd8":
+                return jpeg_date(reader)
+            return exif_date(reader)
+        finally:
+            os.close(fd)
+
+def has_embedded_date(path):
+    ext = os.path.splitext(path)[1].lower()
+    return ext in EXIF_EXTENSIONS or ext in QUICKTIME_EXTENSIONS
+
+def file_date(st):
+    # Birth time where the platform has one; ctime on Linux is the last inode change
+    birthtime = getattr(st, "st_birthtime", None)
+    return birthtime if birthtime else st.st_mtime
+
+def capture_date(path, st, cache=None):
+    # Capture time from the file's own metadata, None if it has none.
+    # cache has get(st) (False when unknown) and put(st, taken), see file_index.CaptureDateCache.
+    if not has_embedded_date(path):
+        return None
+    if cache is not None:
+        cached = cache.get(st)
+        if cached is not False:
+            return cached
+    try:
+        taken = embedded_date(path, st)
+    except (OSError, ValueError, struct.error):
+        taken = None
+    if cache is not None:
+        cache.put(st, taken)
+    return taken
+
+def capture_dates(files, cache=None, workers=8):
+    # files: [(path, stat)] -> {path: capture time} for the files that have one
+    media = [(path, st) for path, st in files if has_embedded_date(path)]
+    if not media:
+        return {}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda item: capture_date(item[0], item[1], cache), media)
+        return {path: taken for (path, _), taken in zip(media, results) if taken is not None}
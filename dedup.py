@@ -0,0 +1,148 @@
+import os
+import time
+import hashlib
+import threading
+from snapshots import file_digest, copy_range
+import governor
+
+# Duplicate detection that reads as little as possible: files are grouped by
+# the size the scan already has, only size collisions get their first and
+# last block hashed, and only groups that still collide after that are
+# hashed in full, on a thread pool.
+PARTIAL_BLOCK = 64 * 1024
+HASH_WORKERS = 4
+# What happens to every copy but the one kept
+ACTIONS = ("skip", "hardlink", "move")
+DUPLICATES_FOLDER = "Duplicates"
+
+def partial_digest(path, size):
+    # Files up to two blocks are read whole, so this digest is already final for them
+    h = hashlib.blake2b(digest_size=16)
+    gov = governor.current()
+    with gov.operation(), open(path, "rb") as f:
+        if size <= 2 * PARTIAL_BLOCK:
+            with gov.io(size):
+                h.update(f.read())
+        else:
+            with gov.io(PARTIAL_BLOCK):
+                h.update(f.read(PARTIAL_BLOCK))
+            f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+            with gov.io(PARTIAL_BLOCK):
+                h.update(f.read(PARTIAL_BLOCK))
+    return h.hexdigest()
+
+def regroup(groups, digest, workers, on_hash=None, read_limit=None, cached=()):
+    # Split every group by digest(path, size), hashing the files concurrently;
+    # read_limit is how much of each file the digest reads, for on_hash.
+    # Paths in cached are answered without reading, on_hash doesn't see them.
+    def run(item):
+        path, size = item
+        started = time.perf_counter()
+        try:
+            value = digest(path, size)
+        except OSError:
+            # Gone or unreadable since the scan, it can't be a duplicate now
+            return None
+        if on_hash and path not in cached:
+            on_hash(min(size, read_limit) if read_limit else size, time.perf_counter() - started)
+        return value
+
+    items = [item for group in groups for item in group]
+    if workers > 1 and len(items) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+            digests = list(pool.map(run, items))
+    else:
+        digests = [run(item) for item in items]
+
+    split = {}
+    for (path, size), value in zip(items, digests):
+        if value is not None:
+            split.setdefault((size, value), []).append((path, size))
+    return [group for group in split.values() if len(group) > 1]
+
+def find_duplicates(entries, workers=HASH_WORKERS, on_hash=None, organized=(), hashes=None):
+    # entries: (path, stat) pairs as the scan returns them.
+    # Returns {path: path of the copy to keep} for every redundant copy;
+    # the oldest copy is kept, on a tie the shortest name (no "_1" suffix).
+    # organized: (path, stat) pairs of copies earlier runs filed away. They
+    # are compared against and always kept, never reported themselves.
+    # hashes: {path: full digest} known up front; digests computed here are added.
+    # on_hash(nbytes, seconds) is called after each file read, partial or full.
+    stats = {}
+    by_size = {}
+    inodes = set()
+    kept_first = set()
+    # Organized copies go first, so a scanned hardlink of one counts as shared data
+    for source, pairs in ((kept_first, organized), (None, entries)):
+        for path, st in pairs:
+            # Empty files are all alike but cost nothing; hardlinks already share their data
+            if not st.st_size or (st.st_dev, st.st_ino) in inodes:
+                continue
+            inodes.add((st.st_dev, st.st_ino))
+            stats[path] = st
+            by_size.setdefault(st.st_size, []).append((path, st.st_size))
+            if source is not None:
+                source.add(path)
+
+    def worth_hashing(group):
+        return len(group) > 1 and any(path not in kept_first for path, _ in group)
+
+    known = dict(hashes or {})
+
+    def full_digest(path, size):
+        value = known.get(path)
+        if value is None:
+            value = file_digest(path)
+            if hashes is not None:
+                hashes[path] = value
+        return value
+
+    groups = [group for group in by_size.values() if worth_hashing(group)]
+    groups = [group for group in regroup(groups, partial_digest, workers, on_hash, 2 * PARTIAL_BLOCK)
+              if worth_hashing(group)]
+    small = [group for group in groups if group[0][1] <= 2 * PARTIAL_BLOCK]
+    large = [group for group in groups if group[0][1] > 2 * PARTIAL_BLOCK]
+    groups = small + regroup(large, full_digest, workers, on_hash, cached=known)
+
+    duplicates = {}
+    for group in groups:
+        paths = sorted((path for path, _ in group),
+                       key=lambda p: (p not in kept_first, stats[p].st_mtime_ns, len(os.path.basename(p)), p))
+        for path in paths[1:]:
+            if path not in kept_first:
+                duplicates[path] = paths[0]
+    return duplicates
+
+def link_duplicate(path, target):
+    # Replace path with a hardlink to target, atomically
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.link")
+    with governor.current().io(ops=2):
+        os.link(target, tmp)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def unlink_duplicate(path, target, mode, mtime_ns):
+    # Undo link_duplicate: give path its own copy of the data back, if it
+    # still shares it with target
+    try:
+        if not os.path.samestat(os.stat(path), os.stat(target)):
+            return False
+    except FileNotFoundError:
+        return False
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        copy_range(path, tmp)
+        os.chmod(tmp, mode)
+        os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return True
@@ -0,0 +1,219 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Local metadata index of everything the organizer has placed, so re-runs can
+# skip unchanged files and searches never have to walk the tree.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    root TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    category TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    hash TEXT,
+    organized INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_user_name ON files(user, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_user_ext ON files(user, ext);
+CREATE INDEX IF NOT EXISTS files_user_mtime ON files(user, mtime_ns);
+CREATE INDEX IF NOT EXISTS files_user_size ON files(user, size);
+-- Capture dates read from photos and videos before they are organized; taken
+-- is NULL for a file that has none. A row is only good for that exact version
+-- of the file and is dropped once the file has been organized.
+CREATE TABLE IF NOT EXISTS capture_dates (
+    ino INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    taken REAL,
+    PRIMARY KEY (ino, dev)
+);
+"""
+
+# Substring search on names through a trigram full-text index, when SQLite has it
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(name, content='files', content_rowid='rowid', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE OF name ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    INSERT INTO files_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+"""
+
+UPSERT = """
+INSERT INTO files (path, user, root, name, ext, category, size, mtime_ns, ino, hash, organized, indexed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    user = excluded.user, root = excluded.root, name = excluded.name, ext = excluded.ext,
+    category = excluded.category, size = excluded.size, mtime_ns = excluded.mtime_ns,
+    ino = excluded.ino, hash = COALESCE(excluded.hash, CASE WHEN files.size = excluded.size
+        AND files.mtime_ns = excluded.mtime_ns THEN files.hash END),
+    organized = excluded.organized, indexed_at = excluded.indexed_at
+"""
+
+LOOKUP_CHUNK = 500
+
+class FileIndex:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        # WAL lets the search screen read while an organize run is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, paths):
+        # path -> (size, mtime_ns, ino, category, organized)
+        found = {}
+        paths = list(paths)
+        for start in range(0, len(paths), LOOKUP_CHUNK):
+            chunk = paths[start:start + LOOKUP_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT path, size, mtime_ns, ino, category, organized FROM files "
+                f"WHERE path IN ({','.join('?' * len(chunk))})", chunk)
+            for path, *rest in rows:
+                found[path] = tuple(rest)
+        return found
+
+    def record(self, user, root, rows, moved_from=()):
+        # rows: (path, category, size, mtime_ns, ino, hash, organized), one transaction per batch
+        now = time.time()
+        with self.conn:
+            if moved_from:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in moved_from))
+            self.conn.executemany(UPSERT, (
+                (path, user, root, os.path.basename(path), os.path.splitext(path)[1].lower(),
+                 category, size, mtime_ns, ino, digest, int(organized), now)
+                for path, category, size, mtime_ns, ino, digest, organized in rows))
+            # Organized files are skipped from now on, their capture dates won't be asked for again
+            self.conn.executemany("DELETE FROM capture_dates WHERE ino = ? AND size = ? AND mtime_ns = ?",
+                                  ((ino, size, mtime_ns) for _, _, size, mtime_ns, ino, _, organized in rows
+                                   if organized))
+
+    def organized_by_size(self, user, root, sizes):
+        # (path, size, mtime_ns, ino, category, hash) of the files organized under root with one of these sizes
+        found = []
+        sizes = list(sizes)
+        for start in range(0, len(sizes), LOOKUP_CHUNK):
+            chunk = sizes[start:start + LOOKUP_CHUNK]
+            found.extend(self.conn.execute(
+                f"SELECT path, size, mtime_ns, ino, category, hash FROM files "
+                f"WHERE user = ? AND root = ? AND organized = 1 AND size IN ({','.join('?' * len(chunk))})",
+                [user, root] + chunk))
+        return found
+
+    def set_hashes(self, rows):
+        # rows: (path, size, mtime_ns, hash); only stored if the file is still that version
+        with self.conn:
+            self.conn.executemany("UPDATE files SET hash = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                  ((digest, path, size, mtime_ns) for path, size, mtime_ns, digest in rows))
+
+    def capture_dates(self, stats, version):
+        # (dev, ino) -> capture time or None, for the files whose row is still current
+        found = {}
+        wanted = {(st.st_ino, st.st_dev): st for st in stats}
+        inos = sorted({ino for ino, _ in wanted})
+        for start in range(0, len(inos), LOOKUP_CHUNK):
+            chunk = inos[start:start + LOOKUP_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT ino, dev, size, mtime_ns, version, taken FROM capture_dates "
+                f"WHERE ino IN ({','.join('?' * len(chunk))})", chunk)
+            for ino, dev, size, mtime_ns, row_version, taken in rows:
+                st = wanted.get((ino, dev))
+                if st is not None and (st.st_size, st.st_mtime_ns, version) == (size, mtime_ns, row_version):
+                    found[(dev, ino)] = taken
+        return found
+
+    def record_capture_dates(self, rows, version):
+        # rows: (stat, capture time or None); a reused inode replaces the old row
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO capture_dates (ino, dev, size, mtime_ns, version, taken) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns, version, taken) for st, taken in rows))
+
+    def forget(self, paths):
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in paths))
+
+    def search(self, user, name=None, ext=None, since=None, until=None, limit=1000):
+        clauses = ["files.user = ?"]
+        params = [user]
+        source = "files"
+        order = "files.mtime_ns DESC"
+        if name:
+            if self.fts and len(name) >= 3:
+                # Drive the query from the trigram index and keep its rowid order,
+                # sorting every hit of a broad term by date would cost a full pass
+                source = "files_fts CROSS JOIN files ON files.rowid = files_fts.rowid"
+                order = "files_fts.rowid DESC"
+                clauses.append("files_fts MATCH ?")
+                params.append('"' + name.replace('"', '""') + '"')
+            else:
+                clauses.append("files.name LIKE ? ESCAPE '\\'")
+                escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+        if ext:
+            ext = ext.lower()
+            clauses.append("files.ext = ?")
+            params.append(ext if ext.startswith(".") else "." + ext)
+        if since is not None:
+            clauses.append("files.mtime_ns >= ?")
+            params.append(int(since * 1e9))
+        if until is not None:
+            clauses.append("files.mtime_ns < ?")
+            params.append(int(until * 1e9))
+        params.append(limit)
+        return self.conn.execute(
+            f"SELECT files.path, files.category, files.size, files.mtime_ns FROM {source} "
+            f"WHERE {' AND '.join(clauses)} ORDER BY {order} LIMIT ?", params).fetchall()
+
+class CaptureDateCache:
+    # The get/put/save cache capture_date.capture_dates expects, over the
+    # index: one query for the files about to be read, one transaction after
+    def __init__(self, index, stats, version):
+        self.index = index
+        self.version = version
+        self.found = index.capture_dates(stats, version)
+        self.new = []
+        self.lock = threading.Lock()
+
+    def get(self, st):
+        return self.found.get((st.st_dev, st.st_ino), False)
+
+    def put(self, st, taken):
+        with self.lock:
+            self.new.append((st, taken))
+
+    def save(self):
+        if self.new:
+            self.index.record_capture_dates(self.new, self.version)
+            self.new = []
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Keeps the organizer from swamping shared storage. Every copy, rename and
+# hash in the process goes through the one governor from current(): token
+# buckets cap bytes/s and operations/s, and the number of file operations
+# in flight is halved while the storage answers slower than the latency
+# target and grows back one at a time once it recovers. Unlimited unless
+# configured, then it only keeps count for the rate shown in the GUI.
+MAX_CONCURRENCY = 16
+# Governed transfers are split into requests no bigger than this, so one
+# 64 MB copy_file_range can't blow through the rate or skew the latency
+LIMITED_CHUNK = 1024 * 1024
+ADJUST_INTERVAL = 0.5
+RATE_WINDOW = 2.0
+RATE_SLOT = 0.25
+
+# ionice classes: (IOPRIO_CLASS_*, level)
+IO_CLASSES = {"idle": (3, 0), "low": (2, 7)}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+# ioprio_set isn't in the os module; syscall numbers per architecture
+IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30, "armv7l": 314,
+              "ppc64le": 273, "s390x": 282, "riscv64": 30}
+
+def set_io_class(name):
+    # Like `ionice -c 3` for the calling thread; threads it starts later inherit it.
+    # Linux only, returns whether it took effect.
+    if name not in IO_CLASSES or not sys.platform.startswith("linux"):
+        return False
+    number = IOPRIO_SET.get(os.uname().machine)
+    if number is None:
+        return False
+    import ctypes
+    io_class, level = IO_CLASSES[name]
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall(number, IOPRIO_WHO_PROCESS, 0, (io_class << IOPRIO_CLASS_SHIFT) | level) == 0
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        # One second's worth by default
+        self.burst = float(burst) if burst is not None else self.rate
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount):
+        # A request may overdraw the bucket; whoever drew it into debt
+        # sleeps it off, and everyone after waits behind that debt
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class IOGovernor:
+    def __init__(self, mb_per_s=None, ops_per_s=None, latency_target_ms=None, io_class=None,
+                 max_concurrency=MAX_CONCURRENCY):
+        self.settings = {"mb_per_s": mb_per_s, "ops_per_s": ops_per_s,
+                         "latency_target_ms": latency_target_ms, "io_class": io_class}
+        self.bytes = TokenBucket(mb_per_s * 1048576) if mb_per_s else None
+        self.ops = TokenBucket(ops_per_s) if ops_per_s else None
+        self.latency_target = latency_target_ms / 1000 if latency_target_ms else None
+        self.io_class = io_class
+        self.limited = bool(self.bytes or self.ops or self.latency_target)
+
+        self.cond = threading.Condition()
+        self.local = threading.local()
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.active = 0
+        self.latency = None
+        self.last_adjust = time.monotonic()
+        self.throttled = 0.0
+        # (slot start, bytes, ops), for the rate over the last RATE_WINDOW seconds
+        self.history = deque()
+
+    def chunk(self, size):
+        return min(size, LIMITED_CHUNK) if self.limited else size
+
+    def enter_thread(self):
+        if self.io_class and not getattr(self.local, "io_class", False):
+            self.local.io_class = True
+            set_io_class(self.io_class)
+
+    @contextmanager
+    def operation(self):
+        # One file being copied, hashed or renamed. Nested operations in the
+        # same thread (a copy verifying its hash) share the outer slot.
+        if not self.limited:
+            # Nothing to hold back, skip the bookkeeping
+            self.enter_thread()
+            yield self
+            return
+        self.enter_thread()
+        depth = getattr(self.local, "depth", 0)
+        if not depth:
+            with self.cond:
+                while self.active >= self.concurrency:
+                    self.cond.wait()
+                self.active += 1
+        self.local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self.local.depth = depth
+            if not depth:
+                with self.cond:
+                    self.active -= 1
+                    self.cond.notify()
+
+    @contextmanager
+    def io(self, nbytes=0, ops=1):
+        # One request to storage: wait for tokens, then time only the request itself
+        waited = 0.0
+        if self.ops is not None and ops:
+            waited += self.ops.take(ops)
+        if self.bytes is not None and nbytes:
+            waited += self.bytes.take(nbytes)
+        started = time.perf_counter()
+        yield
+        self.record(nbytes, ops, time.perf_counter() - started, waited)
+
+    def record(self, nbytes, ops, seconds, waited=0.0):
+        now = time.monotonic()
+        with self.cond:
+            self.throttled += waited
+            slot = now - now % RATE_SLOT
+            if self.history and self.history[-1][0] == slot:
+                self.history[-1][1] += nbytes
+                self.history[-1][2] += ops
+            else:
+                self.history.append([slot, nbytes, ops])
+                while self.history[0][0] < now - RATE_WINDOW:
+                    self.history.popleft()
+            if self.latency_target is None or not ops:
+                return
+            self.latency = seconds if self.latency is None else self.latency * 0.8 + seconds * 0.2
+            if now - self.last_adjust < ADJUST_INTERVAL:
+                return
+            self.last_adjust = now
+            if self.latency > self.latency_target and self.concurrency > 1:
+                self.concurrency = max(1, self.concurrency // 2)
+            elif self.latency < self.latency_target * 0.8 and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self.cond.notify()
+
+    def snapshot(self):
+        with self.cond:
+            now = time.monotonic()
+            recent = [entry for entry in self.history if entry[0] >= now - RATE_WINDOW]
+            return {
+                "mb_per_s": round(sum(entry[1] for entry in recent) / RATE_WINDOW / 1048576, 2),
+                "ops_per_s": round(sum(entry[2] for entry in recent) / RATE_WINDOW, 1),
+                "concurrency": self.concurrency,
+                "active": self.active,
+                "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+                "throttled": round(self.throttled, 3),
+                "limited": self.limited,
+                "settings": dict(self.settings),
+            }
+
+active_governor = IOGovernor()
+
+def current():
+    return active_governor
+
+def configure(mb_per_s=None, ops_per_s=None, latency_target_ms=None, io_class=None):
+    # Replaces the process-wide governor; work already running keeps the old one
+    global active_governor
+    active_governor = IOGovernor(mb_per_s, ops_per_s, latency_target_ms, io_class)
+    return active_governor
+
+def format_rate(snapshot):
+    # One status line: what storage is seeing right now, and why it's held back
+    text = f"I/O {snapshot['mb_per_s']:.1f} MB/s, {snapshot['ops_per_s']:.0f} ops/s"
+    if snapshot["limited"]:
+        text += f", {snapshot['active']}/{snapshot['concurrency']} at once"
+        if snapshot["latency_ms"] is not None:
+            text += f", {snapshot['latency_ms']:.0f} ms"
+    return text
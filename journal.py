@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Append-only undo journal, one JSON-lines file per organize run:
+#   {"op": "begin", "run": ..., "user": ..., "folder": ..., "ts": ...}
+#   {"op": "move", "src": ..., "dest": ...}      written once dest holds the file, before src goes
+#   {"op": "end", "moved": ..., "ts": ...}       missing if the run was killed
+#   {"op": "undone", "restored": ..., "ts": ...}
+FSYNC_EVERY = 256
+FSYNC_INTERVAL = 0.5
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+
+class RunJournal:
+    def __init__(self, path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # Held for the lifetime of the run so recovery can tell live runs from dead ones
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.count = 0
+        # Cross-device moves are recorded from the copy workers
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, journal_dir, user, folder, **kwargs):
+        os.makedirs(journal_dir, exist_ok=True)
+        run_id = new_run_id()
+        journal = cls(os.path.join(journal_dir, f"{run_id}.jsonl"), **kwargs)
+        journal.run_id = run_id
+        journal.append({"op": "begin", "run": run_id, "user": user,
+                        "folder": os.path.abspath(folder), "ts": time.time()})
+        journal.sync()
+        return journal
+
+    def append(self, record):
+        # One write() per record: the kernel has it even if the process dies,
+        # fsync (for power loss) is batched by count and time
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            os.write(self.fd, line)
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync_locked()
+
+    def record(self, op, **fields):
+        with self.lock:
+            self.count += 1
+        self.append({"op": op, **fields})
+
+    def sync(self):
+        with self.lock:
+            self.sync_locked()
+
+    def sync_locked(self):
+        if self.unsynced:
+            os.fsync(self.fd)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self, **fields):
+        self.append({"op": "end", "ts": time.time(), **fields})
+        self.sync()
+        os.close(self.fd)
+        self.fd = None
+
+def read_run(path):
+    header = None
+    records = []
+    footer = None
+    undone = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn final line from a crash mid-write
+                continue
+            op = record.get("op")
+            if op == "begin":
+                header = record
+            elif op == "end":
+                footer = record
+            elif op == "undone":
+                undone = record
+            else:
+                records.append(record)
+    return header, records, footer, undone
+
+def run_is_live(path):
+    if fcntl is None:
+        return False
+    with open(path, "r") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    return False
+
+def list_runs(journal_dir):
+    if not os.path.isdir(journal_dir):
+        return []
+    runs = []
+    for name in sorted(os.listdir(journal_dir)):
+        if not name.endswith(".jsonl"):
+            continue
+        path = os.path.join(journal_dir, name)
+        header, records, footer, undone = read_run(path)
+        if header is None:
+            continue
+        if undone is not None:
+            state = "undone"
+        elif footer is None:
+            state = "running" if run_is_live(path) else "interrupted"
+        elif footer.get("interrupted"):
+            state = "interrupted"
+        else:
+            state = "complete"
+        runs.append({
+            "run": header["run"],
+            "user": header["user"],
+            "folder": header["folder"],
+            "started": header["ts"],
+            "files": sum(1 for r in records if r.get("op") == "move"),
+            "state": state,
+            "closed": footer is not None,
+            "path": path,
+        })
+    runs.sort(key=lambda run: run["started"])
+    return runs
+
+def recover_runs(journal_dir):
+    # Close out runs whose process died so they show up as undoable
+    recovered = []
+    for run in list_runs(journal_dir):
+        if run["state"] != "interrupted" or run["closed"]:
+            continue
+        _, records, _, _ = read_run(run["path"])
+        # A move record is written before the move, check which ones happened
+        moved = sum(1 for r in records if r.get("op") == "move" and os.path.exists(r["dest"]))
+        with open(run["path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "end", "ts": time.time(), "moved": moved, "interrupted": True}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        recovered.append(run)
+    return recovered
+
+def mark_undone(path, restored):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "undone", "restored": restored, "ts": time.time()}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
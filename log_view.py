@@ -0,0 +1,176 @@
+import os
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+# Random access to the lines of a large, append-only log without reading it
+# all in. The file is memory-mapped and a table of line start offsets is
+# built once, then saved next to it keyed by inode, size and mtime; a log
+# that only grew since is indexed from where the saved table stopped.
+INDEX_CHUNK = 4 * 1024 * 1024
+SEARCH_CHUNK = 1024 * 1024
+INDEX_MAGIC = b"LOGIDX1\n"
+INDEX_HEADER = struct.Struct("<8sQQQQ")
+
+class LogIndex:
+    def __init__(self, path, cache_path=None):
+        self.path = path
+        self.cache_path = cache_path if cache_path is not None else path + ".idx"
+        self.file = None
+        self.map = None
+        self.ino = None
+        self.size = 0
+        self.mtime_ns = None
+        # Start offset of every complete line, and the offset just past the last newline
+        self.starts = array("Q")
+        self.indexed = 0
+        self.load_cache()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, "rb") as f:
+                magic, ino, size, mtime_ns, indexed = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if magic != INDEX_MAGIC:
+                    return
+                starts = array("Q")
+                starts.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return
+        self.ino, self.size, self.mtime_ns, self.indexed, self.starts = ino, size, mtime_ns, indexed, starts
+
+    def save_cache(self):
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.ino, self.size, self.mtime_ns, self.indexed))
+                self.starts.tofile(f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            # The index is only a cache, a read-only log dir just means rebuilding next time
+            pass
+
+    def reset(self):
+        self.starts = array("Q")
+        self.indexed = 0
+
+    def refresh(self):
+        # Cheap when nothing changed: one stat. Returns True if the lines changed.
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            changed = bool(self.starts) or self.size > 0
+            self.close()
+            self.reset()
+            self.ino, self.size, self.mtime_ns = None, 0, None
+            return changed
+        if self.map is not None and (st.st_ino, st.st_size, st.st_mtime_ns) == (self.ino, self.size, self.mtime_ns):
+            return False
+
+        if st.st_ino != self.ino or st.st_size < self.indexed:
+            # Rotated or truncated: start over
+            self.reset()
+        unchanged = (st.st_ino, st.st_size, st.st_mtime_ns) == (self.ino, self.size, self.mtime_ns)
+        self.ino, self.size, self.mtime_ns = st.st_ino, st.st_size, st.st_mtime_ns
+        self.remap()
+        if self.indexed and self.map[self.indexed - 1:self.indexed] != b"\n":
+            # Not the file the saved table was built from
+            self.reset()
+        before = len(self.starts)
+        self.index_from(self.indexed)
+        if len(self.starts) != before:
+            self.save_cache()
+        return not unchanged
+
+    def remap(self):
+        self.close()
+        if not self.size:
+            return
+        self.file = open(self.path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+
+    def index_from(self, pos):
+        mm = self.map
+        while mm is not None and pos < self.size:
+            end = mm.rfind(b"\n", pos, pos + INDEX_CHUNK)
+            if end < 0:
+                # A single line longer than a chunk, or the unfinished last line
+                end = mm.find(b"\n", pos + INDEX_CHUNK)
+                if end < 0:
+                    break
+            end += 1
+            # Line lengths come from one split per chunk, so the scan runs at C speed
+            lengths = [len(line) + 1 for line in mm[pos:end].split(b"\n")[:-1]]
+            self.starts.extend(accumulate(lengths[:-1], initial=pos))
+            pos = end
+        self.indexed = pos
+
+    def __len__(self):
+        # An unfinished last line still counts, so a live log shows it straight away
+        return len(self.starts) + (1 if self.size > self.indexed else 0)
+
+    def line_span(self, i):
+        start = self.starts[i] if i < len(self.starts) else self.indexed
+        end = self.starts[i + 1] if i + 1 < len(self.starts) else (self.indexed if i < len(self.starts) else self.size)
+        return start, end
+
+    def lines(self, first, count):
+        # Decodes only the requested window
+        last = min(len(self), first + count)
+        if first >= last or self.map is None:
+            return []
+        start = self.line_span(first)[0]
+        end = self.line_span(last - 1)[1]
+        text = self.map[start:end].decode("utf-8", errors="replace")
+        return text.split("\n")[:last - first]
+
+    def line_of(self, offset):
+        if offset >= self.indexed:
+            return len(self) - 1
+        return bisect_right(self.starts, offset) - 1
+
+    def search(self, term, from_line=0, backwards=False, ignore_case=True):
+        # Line number of the next match starting at from_line, or None.
+        # Scans the mapped file a chunk at a time; ignore_case folds ASCII only.
+        if not term or self.map is None or not len(self):
+            return None
+        needle = term.encode("utf-8")
+        if ignore_case:
+            needle = needle.lower()
+        overlap = len(needle) - 1
+        from_line = max(0, min(from_line, len(self) - 1))
+
+        if not backwards:
+            pos = self.line_span(from_line)[0]
+            while pos < self.size:
+                chunk = self.map[pos:pos + SEARCH_CHUNK + overlap]
+                found = (chunk.lower() if ignore_case else chunk).find(needle)
+                if found >= 0:
+                    return self.line_of(pos + found)
+                pos += SEARCH_CHUNK
+        else:
+            end = self.line_span(from_line)[1]
+            while end > 0:
+                start = max(0, end - SEARCH_CHUNK)
+                chunk = self.map[start:end + overlap]
+                # Only matches that start before end, later ones belong to a later line
+                found = (chunk.lower() if ignore_case else chunk).rfind(needle, 0, end - start + overlap)
+                if found >= 0:
+                    return self.line_of(start + found)
+                end = start
+        return None
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Counters and timings for one run, shared by the worker threads doing the
+# work and read by whoever wants progress. Nothing here is per-file I/O: the
+# GUI polls snapshot() at its own pace and the whole thing is dumped once.
+PHASES = ("backup", "scan", "dedup", "classify", "move", "log", "undo")
+
+# Timing histogram buckets double from 1 µs: bucket n holds samples below 2**n µs
+HISTOGRAM_BUCKETS = 32
+
+class PhaseStats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.total_files = None
+        self.total_bytes = None
+        self.started = None
+        self.finished = None
+        self.samples = 0
+        self.sample_time = 0.0
+        self.max_time = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def sample(self, seconds):
+        self.samples += 1
+        self.sample_time += seconds
+        if seconds > self.max_time:
+            self.max_time = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket the percentile falls in, in seconds
+        if not self.samples:
+            return None
+        target = fraction * self.samples
+        seen = 0
+        for n, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return round(min((1 << n) / 1e6, self.max_time), 6)
+        return round(self.max_time, 6)
+
+    def snapshot(self, now):
+        elapsed = ((self.finished or now) - self.started) if self.started is not None else 0.0
+        files_per_s = self.files / elapsed if elapsed > 0 else 0.0
+        bytes_per_s = self.bytes / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.finished is None:
+            # Bytes predict large-file phases better, fall back to file counts
+            if self.total_bytes and bytes_per_s:
+                eta = max(0.0, (self.total_bytes - self.bytes) / bytes_per_s)
+            elif self.total_files and files_per_s:
+                eta = max(0.0, (self.total_files - self.files) / files_per_s)
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "elapsed": round(elapsed, 3),
+            "done": self.finished is not None,
+            "files_per_s": round(files_per_s, 1),
+            "mb_per_s": round(bytes_per_s / 1048576, 2),
+            "eta": round(eta, 1) if eta is not None else None,
+            "timing": {
+                "samples": self.samples,
+                "total": round(self.sample_time, 6),
+                "max": round(self.max_time, 6),
+                "p50": self.percentile(0.5),
+                "p90": self.percentile(0.9),
+                "p99": self.percentile(0.99),
+                "histogram_us": {str(1 << n): count for n, count in enumerate(self.buckets) if count},
+            },
+        }
+
+class RunMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.order = []
+        self.created = time.time()
+        self.finished = False
+
+    def stats(self, phase):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = PhaseStats()
+            self.order.append(phase)
+        return stats
+
+    def start(self, phase, files=None, nbytes=None):
+        with self.lock:
+            stats = self.stats(phase)
+            if stats.started is None:
+                stats.started = time.monotonic()
+            stats.finished = None
+            if files is not None:
+                stats.total_files = (stats.total_files or 0) + files
+            if nbytes is not None:
+                stats.total_bytes = (stats.total_bytes or 0) + nbytes
+
+    def add(self, phase, files=1, nbytes=0, seconds=None):
+        with self.lock:
+            stats = self.stats(phase)
+            if stats.started is None:
+                stats.started = time.monotonic()
+            stats.files += files
+            stats.bytes += nbytes
+            if seconds is not None:
+                stats.sample(seconds)
+
+    def sample(self, phase, seconds):
+        with self.lock:
+            self.stats(phase).sample(seconds)
+
+    def finish(self, phase):
+        with self.lock:
+            stats = self.stats(phase)
+            if stats.started is None:
+                stats.started = time.monotonic()
+            stats.finished = time.monotonic()
+
+    @contextmanager
+    def phase(self, phase, files=None, nbytes=None):
+        self.start(phase, files, nbytes)
+        try:
+            yield self
+        finally:
+            self.finish(phase)
+
+    def close(self):
+        with self.lock:
+            now = time.monotonic()
+            for stats in self.phases.values():
+                if stats.started is not None and stats.finished is None:
+                    stats.finished = now
+            self.finished = True
+
+    def current(self):
+        # The latest phase still running that knows how much work it has
+        running = [p for p in self.order if self.phases[p].finished is None]
+        for phase in reversed(running):
+            if self.phases[phase].total_files is not None:
+                return phase
+        return running[-1] if running else None
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                "current": self.current(),
+                "finished": self.finished,
+                "phases": {phase: self.phases[phase].snapshot(now) for phase in self.order},
+            }
+
+    def dump(self, path, **fields):
+        # One JSON document per run, for comparing runs over time
+        report = dict(fields)
+        report["started"] = self.created
+        report.update(self.snapshot())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp, path)
+        return path
+
+def format_progress(snapshot, labels=None):
+    # (percent or None, one status line) for the phase currently running
+    phase = snapshot["current"]
+    if phase is None:
+        return None, ""
+    stats = snapshot["phases"][phase]
+    label = (labels or {}).get(phase, phase.capitalize())
+    percent = None
+    if stats["total_bytes"]:
+        percent = min(100.0, 100.0 * stats["bytes"] / stats["total_bytes"])
+    elif stats["total_files"]:
+        percent = min(100.0, 100.0 * stats["files"] / stats["total_files"])
+    parts = [f"{label}: {stats['files']}" + (f"/{stats['total_files']}" if stats["total_files"] is not None else "")
+             + " file(s)", f"{stats['files_per_s']:.0f} files/s"]
+    if stats["bytes"]:
+        parts.append(f"{stats['mb_per_s']:.1f} MB/s")
+    if stats["eta"] is not None:
+        minutes, seconds = divmod(int(stats["eta"]), 60)
+        parts.append(f"ETA {minutes // 60}:{minutes % 60:02}:{seconds:02}")
+    return percent, " · ".join(parts)
@@ -0,0 +1,272 @@
+import os
+import errno
+import time
+import shutil
+import threading
+
+from snapshots import file_digest
+import governor
+
+# Moves within one filesystem are a hardlink and an unlink, done inline. Moves
+# across filesystems are copied on a small worker pool so one huge file doesn't
+# hold up everything behind it; the source is removed only after the copy checks
+# out. Either way a name taken since planning is never overwritten: os.link
+# fails on it where os.rename/os.replace would replace it.
+CROSS_DEVICE_WORKERS = 4
+COPY_CHUNK = 64 * 1024 * 1024
+FALLBACK_BUFFER = 8 * 1024 * 1024
+# What a copy returns when its source was gone before it started
+VANISHED = "vanished"
+# os.link errors from filesystems (or mounts) that have no hardlinks
+NO_HARDLINKS = (errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.EMLINK)
+
+def copy_data(src_fd, dst_fd, size):
+    offset = 0
+    gov = governor.current()
+    chunk_size = gov.chunk(COPY_CHUNK)
+    # copy_file_range: in-kernel, and server-side on NFS 4.2 / SMB3
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                count = min(chunk_size, size - offset)
+                with gov.io(count):
+                    copied = os.copy_file_range(src_fd, dst_fd, count)
+                if copied == 0:
+                    break
+                offset += copied
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    # sendfile: still no user-space copy, works between most filesystems
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                count = min(chunk_size, size - offset)
+                with gov.io(count):
+                    sent = os.sendfile(dst_fd, src_fd, offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buffer_size = gov.chunk(FALLBACK_BUFFER)
+    while True:
+        with gov.io(max(0, min(buffer_size, size - offset))):
+            chunk = os.read(src_fd, buffer_size)
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(dst_fd, view):]
+        if not chunk:
+            break
+        offset += len(chunk)
+
+def copy_verified(src, dest, verify, place=os.replace):
+    # place(tmp, dest) gives the checked copy its name; returns what place returns
+    dest_dir, dest_name = os.path.split(dest)
+    tmp = os.path.join(dest_dir, f".{dest_name}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            st = os.fstat(src_fd)
+            dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+            try:
+                copy_data(src_fd, dst_fd, st.st_size)
+                os.fsync(dst_fd)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        shutil.copystat(src, tmp)
+
+        if os.stat(tmp).st_size != st.st_size:
+            raise OSError(errno.EIO, "Copy is incomplete", dest)
+        if verify == "hash" and file_digest(tmp) != file_digest(src):
+            raise OSError(errno.EIO, "Copy does not match the source", dest)
+        return place(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+class MoveExecutor:
+    def __init__(self, workers=CROSS_DEVICE_WORKERS, verify="size", on_move=None, next_name=None, on_claim=None):
+        self.workers = workers
+        self.verify = verify
+        # on_move(seconds) is called after every finished rename or copy
+        self.on_move = on_move
+        # next_name(src, dest, payload) -> (dest, payload): another name when dest
+        # turns out to be taken; without it a taken dest raises FileExistsError
+        self.next_name = next_name
+        # on_claim(src, dest) runs once dest holds the file and before the old
+        # name goes (the undo record), on the copy workers for cross-device moves
+        self.on_claim = on_claim
+        self.pool = None
+        self.devices = {}
+        self.done = []
+        self.running = []
+        # Payloads of moves whose source no longer existed, see vanished()
+        self.missing = []
+        self.lock = threading.Lock()
+
+    def device(self, dir_path):
+        dev = self.devices.get(dir_path)
+        if dev is None:
+            dev = self.devices[dir_path] = os.stat(dir_path).st_dev
+        return dev
+
+    def move(self, src, dest, payload=None):
+        # payload comes back from completed() once the move has really happened,
+        # or from vanished() if src was deleted before it could be moved
+        try:
+            self.start_move(src, dest, payload)
+        except FileNotFoundError:
+            if os.path.lexists(src):
+                raise
+            with self.lock:
+                self.missing.append(payload)
+
+    def start_move(self, src, dest, payload):
+        if self.device(os.path.dirname(src) or ".") == self.device(os.path.dirname(dest) or "."):
+            try:
+                started = time.perf_counter()
+                gov = governor.current()
+                with gov.operation(), gov.io(ops=2):
+                    payload = self.place(src, src, dest, payload)
+                if self.on_move:
+                    self.on_move(time.perf_counter() - started)
+                with self.lock:
+                    self.done.append(payload)
+                return
+            except OSError as e:
+                # Same st_dev but different mounts (bind mounts) still refuse rename
+                if e.errno != errno.EXDEV:
+                    raise
+        with self.lock:
+            if self.pool is None:
+                # Imported here: most runs never leave one device
+                from concurrent.futures import ThreadPoolExecutor
+                self.pool = ThreadPoolExecutor(max_workers=self.workers)
+            self.running.append((self.pool.submit(self.copy, src, dest, payload), payload))
+
+    def place(self, path, src, dest, payload):
+        # Give the file at path (src itself, or its checked copy) the name dest
+        # without replacing whatever may have appeared there since planning.
+        # on_claim runs between link and unlink: a kill at any point leaves the
+        # file at src, or at dest with its undo record.
+        while True:
+            try:
+                os.link(path, dest, follow_symlinks=False)
+                break
+            except FileExistsError:
+                dest, payload = self.free_name(src, dest, payload)
+            except OSError as e:
+                if e.errno not in NO_HARDLINKS:
+                    raise
+                # No hardlinks here (FAT, some network shares): look, then rename
+                while os.path.lexists(dest):
+                    dest, payload = self.free_name(src, dest, payload)
+                if self.on_claim:
+                    self.on_claim(src, dest)
+                os.rename(path, dest)
+                return payload
+        if self.on_claim:
+            self.on_claim(src, dest)
+        os.unlink(path)
+        return payload
+
+    def free_name(self, src, dest, payload):
+        if self.next_name is None:
+            raise FileExistsError(errno.EEXIST, "Destination exists", dest)
+        return self.next_name(src, dest, payload)
+
+    def copy(self, src, dest, payload):
+        started = time.perf_counter()
+        try:
+            with governor.current().operation():
+                payload = copy_verified(src, dest, self.verify,
+                                        lambda tmp, dest: self.place(tmp, src, dest, payload))
+        except FileNotFoundError:
+            if os.path.lexists(src):
+                raise
+            return VANISHED
+        # The copy has its name and its undo record, the source can go
+        try:
+            os.remove(src)
+        except FileNotFoundError:
+            pass
+        if self.on_move:
+            self.on_move(time.perf_counter() - started)
+        return payload
+
+    def completed(self):
+        with self.lock:
+            # One done() per future: a copy finishing between two passes
+            # would otherwise land in neither list and never be reported
+            finished = []
+            running = []
+            for future, payload in self.running:
+                (finished if future.done() else running).append((future, payload))
+            self.running = running
+            done, self.done = self.done, []
+        return self.collect(finished, done)
+
+    def drain(self):
+        with self.lock:
+            running, self.running = self.running, []
+            done, self.done = self.done, []
+        return self.collect(running, done)
+
+    def collect(self, futures, done):
+        error = None
+        missing = []
+        for future, payload in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            # A copy reports its payload, with the name it got if dest was taken
+            if result is VANISHED:
+                missing.append(payload)
+            else:
+                done.append(result)
+        if missing:
+            with self.lock:
+                self.missing.extend(missing)
+        if error is not None:
+            # The moves that did happen are still reported, through finished()
+            with self.lock:
+                self.done.extend(done)
+            raise error
+        return done
+
+    def finished(self):
+        # After a failure and close(): every move that happened and wasn't
+        # reported yet; the copy errors have already been raised
+        with self.lock:
+            running, self.running = self.running, []
+            done, self.done = self.done, []
+        for future, payload in running:
+            if future.done() and future.exception() is None and future.result() is not VANISHED:
+                done.append(future.result())
+        return done
+
+    def vanished(self):
+        # Payloads of moves skipped because the source was gone, since the last call
+        with self.lock:
+            missing, self.missing = self.missing, []
+        return missing
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
@@ -1,14 +1,27 @@
 import os
-import shutil
+import sys
 import json
-from datetime import datetime
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+import time
+import fnmatch
+import itertools
 import threading
+from snapshots import SnapshotStore
+from activity_log import ActivityLog
+import journal
+from journal import RunJournal
+from rules import RuleSet, load_config, merge_configs
+from sniff import ProbeCache, sniff_many
+from capture_date import capture_dates, file_date, has_embedded_date, PARSE_VERSION
+from dedup import find_duplicates, link_duplicate, unlink_duplicate, DUPLICATES_FOLDER, ACTIONS as DEDUP_ACTIONS
+from plan import MovePlan
+from mover import MoveExecutor
+from metrics import RunMetrics
+from scheduler import JobScheduler, FolderLocks
+import governor
 
 # Backend functions from your original code
 FILE_TYPES = {
-    "Images": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".svg"],
+    "Images": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".svg", ".webp", ".heic", ".heif", ".avif"],
     "Documents": [".pdf", ".doc", ".docx", ".txt", ".ppt", ".pptx", ".xls", ".xlsx", ".csv"],
     "Videos": [".mp4", ".avi", ".mov", ".mkv", ".flv", ".wmv"],
     "Audio": [".mp3", ".wav", ".aac", ".flac", ".ogg", ".m4a"],
@@ -22,29 +35,122 @@ SIZE_LIMITS = {
 }
 
 DATA_DIR = "data"
+# Hardlinking into the backup store is free but aliases the live file, see snapshots.clone_file
+BACKUP_HARDLINKS = False
+# One file per user; the shared users.json of older versions is only read
+USERS_DIR = os.path.join(DATA_DIR, "users")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
+# Only read to migrate the single-slot undo file of older versions
 UNDO_FILE = os.path.join(DATA_DIR, "undo_log.json")
+JOURNAL_DIR = os.path.join(DATA_DIR, "journal")
+RULES_DIR = os.path.join(DATA_DIR, "rules")
+RULES_FILENAME = ".organizer-rules.json"
+PROBE_CACHE_FILE = os.path.join(DATA_DIR, "probe_cache.json")
+INDEX_FILE = os.path.join(DATA_DIR, "index.sqlite3")
+# One JSON report per organize/undo run, under <METRICS_DIR>/<user>/
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+# Optional limits for shared storage, e.g.
+#   {"mb_per_s": 40, "ops_per_s": 400, "latency_target_ms": 20, "io_class": "idle"}
+# see governor.configure. The command line can override each one.
+IO_LIMITS_FILE = os.path.join(DATA_DIR, "io_limits.json")
+IO_LIMIT_KEYS = ("mb_per_s", "ops_per_s", "latency_target_ms", "io_class")
+# Folder locks for the job scheduler, see scheduler.FolderLocks
+LOCK_DIR = os.path.join(DATA_DIR, "locks")
+JOB_WORKERS = 4
+SEARCH_LIMIT = 1000
+# Seconds a file must stay unchanged before watch mode moves it
+WATCH_SETTLE = 0.5
+# Rows applied between journal syncs and progress updates when executing a plan
+EXECUTE_BATCH = 1000
 
 def ensure_data_dirs():
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(os.path.join(DATA_DIR, "logs"), exist_ok=True)
     os.makedirs(os.path.join(DATA_DIR, "backups"), exist_ok=True)
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    os.makedirs(RULES_DIR, exist_ok=True)
+    os.makedirs(USERS_DIR, exist_ok=True)
+    os.makedirs(LOCK_DIR, exist_ok=True)
 
-def load_users():
+def valid_username(username):
+    # Usernames become file and folder names under data/, they can't name a path
+    return (bool(username) and username not in (".", "..") and "\0" not in username
+            and not any(sep in username for sep in (os.sep, os.altsep, "/", "\\") if sep))
+
+def user_file(username):
+    if not valid_username(username):
+        raise ValueError(f"Invalid username: {username!r}")
+    return os.path.join(USERS_DIR, f"{username}.json")
+
+def write_json_atomic(path, data):
+    # Readers see the old file or the new one, never half of either
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_legacy_users():
     if not os.path.exists(USERS_FILE):
         return {}
     with open(USERS_FILE, "r") as f:
         return json.load(f)
 
+def load_user(username):
+    if not valid_username(username):
+        return None
+    try:
+        with open(user_file(username), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return load_legacy_users().get(username)
+
+def load_users():
+    users = load_legacy_users()
+    if os.path.isdir(USERS_DIR):
+        for name in os.listdir(USERS_DIR):
+            if name.endswith(".json"):
+                with open(os.path.join(USERS_DIR, name), "r") as f:
+                    users[name[:-5]] = json.load(f)
+    return users
+
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f)
+    os.makedirs(USERS_DIR, exist_ok=True)
+    for username, record in users.items():
+        write_json_atomic(user_file(username), record)
+
+def create_user(username, record):
+    # False if the name is taken; two registrations racing can't both win.
+    # ValueError for a name valid_username() refuses.
+    if not valid_username(username):
+        raise ValueError("Usernames can't contain path separators or be '.' or '..'")
+    if username in load_legacy_users():
+        return False
+    os.makedirs(USERS_DIR, exist_ok=True)
+    tmp = f"{user_file(username)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(record, f)
+    try:
+        os.link(tmp, user_file(username))
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(tmp)
+
+DEFAULT_RULES = RuleSet(FILE_TYPES)
 
 def get_category(extension):
-    for category, exts in FILE_TYPES.items():
-        if extension.lower() in exts:
-            return category
-    return "Others"
+    return DEFAULT_RULES.ext_map.get(extension.lower(), "Others")
+
+def load_rules(username, folder_path):
+    # data/rules/<user>.json, then <folder>/.organizer-rules.json on top
+    configs = [load_config(os.path.join(RULES_DIR, f"{username}.json")),
+               load_config(os.path.join(folder_path, RULES_FILENAME))]
+    if not any(configs):
+        return DEFAULT_RULES
+    return RuleSet(FILE_TYPES, merge_configs(configs))
 
 def get_size_group(size):
     if size <= SIZE_LIMITS["Small"]:
@@ -53,415 +159,912 @@ def get_size_group(size):
         return "Medium"
     return "Large"
 
+def open_log(username):
+    # Writes <user>_log.txt and <user>_log.jsonl, keep it open for a whole run
+    return ActivityLog(os.path.join(DATA_DIR, "logs", f"{username}_log"))
+
 def create_log(username, message):
-    log_file = os.path.join(DATA_DIR, "logs", f"{username}_log.txt")
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(f"{datetime.now()} - {message}\n")
-
-def backup_folder(username, folder_path):
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_dir = os.path.join(DATA_DIR, "backups", username, timestamp)
-    os.makedirs(backup_dir, exist_ok=True)
-    for item in os.listdir(folder_path):
-        src_path = os.path.join(folder_path, item)
-        if os.path.isfile(src_path):
-            shutil.copy2(src_path, backup_dir)
-    return backup_dir
-
-class FileOrganizerGUI:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("File Organizer")
-        self.root.geometry("800x600")
-        self.root.configure(bg="#f0f0f0")
-        
-        # Configure styles
-        self.style = ttk.Style()
-        self.style.theme_use('clam')
-        
-        self.current_user = None
-        ensure_data_dirs()
-        
-        # Initialize with login screen
-        self.show_login_screen()
-        
-    def clear_window(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
-    
-    def show_login_screen(self):
-        self.clear_window()
-        
-        # Main frame
-        main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
-        
-        # Title
-        title_label = tk.Label(main_frame, text="📁 File Organizer", 
-                              font=("Arial", 24, "bold"), bg="#f0f0f0", fg="#2c3e50")
-        title_label.pack(pady=(50, 30))
-        
-        # Login form frame
-        form_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
-        form_frame.pack(pady=20, padx=100, fill="x")
-        
-        tk.Label(form_frame, text="Login / Register", font=("Arial", 16, "bold"), 
-                bg="#ffffff", fg="#34495e").pack(pady=20)
-        
-        # Username field
-        tk.Label(form_frame, text="Username:", font=("Arial", 10), 
-                bg="#ffffff").pack(pady=(10, 5))
-        self.username_entry = tk.Entry(form_frame, font=("Arial", 12), width=30)
-        self.username_entry.pack(pady=(0, 10))
-        
-        # Password field
-        tk.Label(form_frame, text="Password:", font=("Arial", 10), 
-                bg="#ffffff").pack(pady=(10, 5))
-        self.password_entry = tk.Entry(form_frame, font=("Arial", 12), width=30, show="*")
-        self.password_entry.pack(pady=(0, 20))
-        
-        # Buttons frame
-        buttons_frame = tk.Frame(form_frame, bg="#ffffff")
-        buttons_frame.pack(pady=(0, 20))
-        
-        login_btn = tk.Button(buttons_frame, text="Login", command=self.login,
-                             bg="#3498db", fg="white", font=("Arial", 12, "bold"),
-                             padx=20, pady=8, cursor="hand2")
-        login_btn.pack(side="left", padx=(0, 10))
-        
-        register_btn = tk.Button(buttons_frame, text="Register", command=self.register,
-                               bg="#2ecc71", fg="white", font=("Arial", 12, "bold"),
-                               padx=20, pady=8, cursor="hand2")
-        register_btn.pack(side="left")
-        
-        # Bind Enter key to login
-        self.root.bind('<Return>', lambda e: self.login())
-        
-    def login(self):
-        username = self.username_entry.get().strip()
-        password = self.password_entry.get().strip()
-        
-        if not username or not password:
-            messagebox.showerror("Error", "Please enter both username and password!")
-            return
-        
-        users = load_users()
-        if username in users and users[username]["password"] == password:
-            self.current_user = username
-            messagebox.showinfo("Success", f"Welcome, {username}!")
-            self.show_main_menu()
-        else:
-            messagebox.showerror("Error", "Invalid credentials!")
-    
-    def register(self):
-        username = self.username_entry.get().strip()
-        password = self.password_entry.get().strip()
-        
-        if not username or not password:
-            messagebox.showerror("Error", "Please enter both username and password!")
-            return
-        
-        users = load_users()
-        if username in users:
-            messagebox.showerror("Error", "Username already exists!")
-            return
-        
-        users[username] = {"password": password}
-        save_users(users)
-        messagebox.showinfo("Success", "Registration successful! You can now login.")
-        
-    def show_main_menu(self):
-        self.clear_window()
-        
-        # Main frame
-        main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
-        
-        # Header
-        header_frame = tk.Frame(main_frame, bg="#34495e")
-        header_frame.pack(fill="x", pady=(0, 20))
-        
-        tk.Label(header_frame, text=f"Welcome, {self.current_user}!", 
-                font=("Arial", 18, "bold"), bg="#34495e", fg="white").pack(pady=15)
-        
-        # Menu buttons frame
-        buttons_frame = tk.Frame(main_frame, bg="#f0f0f0")
-        buttons_frame.pack(expand=True)
-        
-        # Create menu buttons
-        buttons = [
-            ("📂 Organize Folder", self.show_organize_screen, "#3498db"),
-            ("⏪ Undo Last Operation", self.undo_operation, "#e67e22"),
-            ("📜 View Log", self.show_log_screen, "#9b59b6"),
-            ("👋 Logout", self.logout, "#e74c3c")
-        ]
-        
-        for i, (text, command, color) in enumerate(buttons):
-            btn = tk.Button(buttons_frame, text=text, command=command,
-                          bg=color, fg="white", font=("Arial", 14, "bold"),
-                          width=25, pady=15, cursor="hand2")
-            btn.pack(pady=15)
-    
-    def show_organize_screen(self):
-        self.clear_window()
-        
-        # Main frame
-        main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
-        
-        # Header
-        header_frame = tk.Frame(main_frame, bg="#3498db")
-        header_frame.pack(fill="x", pady=(0, 20))
-        
-        tk.Label(header_frame, text="📂 Organize Folder", 
-                font=("Arial", 18, "bold"), bg="#3498db", fg="white").pack(pady=15)
-        
-        # Form frame
-        form_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
-        form_frame.pack(fill="both", expand=True, padx=50, pady=20)
-        
-        # Folder selection
-        tk.Label(form_frame, text="Select Folder to Organize:", font=("Arial", 12, "bold"), 
-                bg="#ffffff").pack(pady=(20, 10))
-        
-        folder_frame = tk.Frame(form_frame, bg="#ffffff")
-        folder_frame.pack(fill="x", padx=20, pady=10)
-        
-        self.folder_path_var = tk.StringVar()
-        self.folder_entry = tk.Entry(folder_frame, textvariable=self.folder_path_var, 
-                                   font=("Arial", 11), state="readonly")
-        self.folder_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
-        
-        browse_btn = tk.Button(folder_frame, text="Browse", command=self.browse_folder,
-                             bg="#2ecc71", fg="white", font=("Arial", 10), cursor="hand2")
-        browse_btn.pack(side="right")
-        
-        # Skip extensions
-        tk.Label(form_frame, text="File Extensions to Skip (optional):", 
-                font=("Arial", 12, "bold"), bg="#ffffff").pack(pady=(20, 10))
-        
-        tk.Label(form_frame, text="Enter comma-separated extensions (e.g., .txt,.jpg)", 
-                font=("Arial", 10), bg="#ffffff", fg="#7f8c8d").pack(pady=(0, 5))
-        
-        self.skip_entry = tk.Entry(form_frame, font=("Arial", 11), width=40)
-        self.skip_entry.pack(pady=10)
-        
-        # Progress bar
-        self.progress_var = tk.StringVar(value="Ready to organize...")
-        tk.Label(form_frame, textvariable=self.progress_var, font=("Arial", 10), 
-                bg="#ffffff", fg="#7f8c8d").pack(pady=(20, 10))
-        
-        self.progress_bar = ttk.Progressbar(form_frame, mode='indeterminate')
-        self.progress_bar.pack(fill="x", padx=20, pady=10)
-        
-        # Buttons
-        buttons_frame = tk.Frame(form_frame, bg="#ffffff")
-        buttons_frame.pack(pady=20)
-        
-        organize_btn = tk.Button(buttons_frame, text="🚀 Start Organization", 
-                               command=self.start_organization,
-                               bg="#e67e22", fg="white", font=("Arial", 12, "bold"),
-                               padx=20, pady=10, cursor="hand2")
-        organize_btn.pack(side="left", padx=10)
-        
-        back_btn = tk.Button(buttons_frame, text="← Back", command=self.show_main_menu,
-                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
-                           padx=20, pady=10, cursor="hand2")
-        back_btn.pack(side="left", padx=10)
-    
-    def browse_folder(self):
-        folder = filedialog.askdirectory()
-        if folder:
-            self.folder_path_var.set(folder)
-    
-    def start_organization(self):
-        folder_path = self.folder_path_var.get()
-        if not folder_path:
-            messagebox.showerror("Error", "Please select a folder!")
-            return
-        
-        if not os.path.exists(folder_path):
-            messagebox.showerror("Error", "Folder path does not exist!")
-            return
-        
-        # Start organization in a separate thread
-        self.progress_bar.start()
-        self.progress_var.set("Creating backup...")
-        
-        thread = threading.Thread(target=self.organize_files_thread, args=(folder_path,))
-        thread.daemon = True
-        thread.start()
-    
-    def organize_files_thread(self, folder_path):
+    with open_log(username) as log:
+        log.write(message)
+
+def backup_store(username):
+    return SnapshotStore(os.path.join(DATA_DIR, "backups", username), allow_hardlink=BACKUP_HARDLINKS)
+
+def backup_folder(username, folder_path, recursive=False, max_depth=None, exclude=(), metrics=None):
+    # Unchanged files are recorded by content hash only, nothing is copied twice
+    entries = scan_folder(folder_path, recursive=recursive, max_depth=max_depth, exclude=exclude,
+                          category_folders=load_rules(username, folder_path).folders)
+    return backup_entries(username, folder_path, entries, metrics)
+
+def backup_entries(username, folder_path, entries, metrics=None):
+    if metrics is None:
+        return backup_store(username).create_snapshot(folder_path, entries)
+    with metrics.phase("backup", len(entries), sum(st.st_size for _, st in entries)):
+        return backup_store(username).create_snapshot(
+            folder_path, entries, on_file=lambda st, seconds: metrics.add("backup", 1, st.st_size, seconds))
+
+def list_backups(username):
+    return backup_store(username).list_snapshots()
+
+def restore_backup(username, snapshot_id, target=None):
+    restored = backup_store(username).restore(snapshot_id, target)
+    create_log(username, f"Restored backup {snapshot_id}: {restored} file(s)")
+    return restored
+
+# Headless organize engine (no Tk). One scandir pass, one stat per file.
+CATEGORY_FOLDERS = DEFAULT_RULES.folders
+
+def scan_directory(dir_path, skip, exclude=(), rel_dir=""):
+    files = []
+    subdirs = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            rel_path = os.path.join(rel_dir, entry.name)
+            if exclude and any(fnmatch.fnmatch(entry.name, p) or fnmatch.fnmatch(rel_path, p) for p in exclude):
+                continue
+            # is_file()/is_dir() use the d_type cached by scandir, no extra syscall
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, rel_path))
+                continue
+            if not entry.is_file() or entry.name == RULES_FILENAME:
+                continue
+            if os.path.splitext(entry.name)[1].lower() in skip:
+                continue
+            files.append((entry.path, entry.stat()))
+    return files, subdirs
+
+def scan_folder(folder_path, skip_exts=(), recursive=False, max_depth=None, exclude=(), workers=8,
+                category_folders=CATEGORY_FOLDERS, metrics=None):
+    skip = {e.lower() for e in skip_exts}
+    exclude = tuple(exclude)
+
+    def timed_scan_directory(*args):
+        started = time.perf_counter()
+        files, subdirs = scan_directory(*args)
+        metrics.add("scan", len(files), sum(st.st_size for _, st in files), time.perf_counter() - started)
+        return files, subdirs
+
+    list_directory = scan_directory if metrics is None else timed_scan_directory
+
+    entries, subdirs = list_directory(folder_path, skip, exclude)
+    if not recursive:
+        return entries
+
+    # Never descend into the category folders a previous run created
+    pending = [(path, rel, 1) for path, rel in subdirs if rel not in category_folders and rel != DUPLICATES_FOLDER]
+    if max_depth is not None:
+        pending = [p for p in pending if p[2] <= max_depth]
+    if not pending:
+        return entries
+
+    # Sibling directories are listed concurrently, listing is latency-bound on network storage
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(list_directory, path, skip, exclude, rel): depth for path, rel, depth in pending}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = futures.pop(future)
+                try:
+                    files, children = future.result()
+                except OSError:
+                    # Directory vanished or is unreadable, skip it like the top level would
+                    continue
+                entries.extend(files)
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for path, rel in children:
+                    futures[pool.submit(list_directory, path, skip, exclude, rel)] = depth + 1
+    return entries
+
+def classify_entries(entries, rules=DEFAULT_RULES, sniff=False):
+    categories = []
+    unknown = []
+    # Ages are taken against one clock reading per batch
+    now = time.time()
+    for path, st in entries:
+        category, rule = rules.match(os.path.basename(path), st, now)
+        categories.append(category)
+        if sniff and rule == "default":
+            unknown.append(len(categories) - 1)
+
+    # Only files no rule or extension could place get their header read
+    if unknown:
+        cache = ProbeCache(PROBE_CACHE_FILE)
+        found = sniff_many([entries[i] for i in unknown], cache)
+        for i in unknown:
+            ext = found[entries[i][0]]
+            if ext:
+                categories[i] = rules.ext_map.get(ext, rules.default)
+        cache.save()
+    return categories
+
+def resolve_dates(entries, index=None):
+    # {path: capture time} for the photos and videos that carry one. Dates
+    # already read are kept in the index; a batch without photos or videos
+    # doesn't touch it at all. index: an open FileIndex to use, else one is opened.
+    media = [(path, st) for path, st in entries if has_embedded_date(path)]
+    if not media:
+        return {}
+    from file_index import CaptureDateCache
+    owned = index is None
+    if owned:
+        index = open_index()
+    try:
+        cache = CaptureDateCache(index, (st for _, st in media), PARSE_VERSION)
+        dates = capture_dates(media, cache)
+        cache.save()
+    finally:
+        if owned:
+            index.close()
+    return dates
+
+def destination_parts(name, st, rules=DEFAULT_RULES, category=None, taken=None):
+    # taken: capture time from resolve_dates; without one the file times decide
+    if category is None:
+        category = rules.classify(name, st)
+    created = time.localtime(taken if taken is not None else file_date(st))
+    return category, str(created.tm_year), f"{created.tm_mon:02}", get_size_group(st.st_size)
+
+class DestinationIndex:
+    # In-memory view of the names in every destination directory, filled by
+    # one scandir the first time a directory is used. Free names follow the
+    # same "<base>_<n><ext>" scheme as before without probing the filesystem.
+    def __init__(self, create=True):
+        self.names = {}
+        self.counters = {}
+        self.create = create
+        self.lock = threading.Lock()
+
+    def load(self, dir_path):
+        names = self.names.get(dir_path)
+        if names is None:
+            try:
+                with os.scandir(dir_path) as it:
+                    names = {os.path.normcase(entry.name) for entry in it}
+            except FileNotFoundError:
+                # Planning only: leave the filesystem untouched
+                if self.create:
+                    os.makedirs(dir_path, exist_ok=True)
+                names = set()
+            self.names[dir_path] = names
+        return names
+
+    def claim(self, dir_path, filename):
+        with self.lock:
+            names = self.load(dir_path)
+            candidate = filename
+            if os.path.normcase(candidate) in names:
+                base, extension = os.path.splitext(filename)
+                key = (dir_path, os.path.normcase(filename))
+                counter = self.counters.get(key, 1)
+                candidate = f"{base}_{counter}{extension}"
+                while os.path.normcase(candidate) in names:
+                    counter += 1
+                    candidate = f"{base}_{counter}{extension}"
+                self.counters[key] = counter + 1
+            names.add(os.path.normcase(candidate))
+            return os.path.join(dir_path, candidate)
+
+    def claim_after(self, taken_path, filename):
+        # taken_path was free when claimed but exists now (created after the
+        # directory was read): note it, then claim a name for filename again
+        dir_path = os.path.dirname(taken_path)
+        with self.lock:
+            self.load(dir_path).add(os.path.normcase(os.path.basename(taken_path)))
+        return self.claim(dir_path, filename)
+
+def plan_entries(plan, entries, rules, destinations, sniff=False, metrics=None, duplicates=None, dedup=None,
+                 index=None):
+    # duplicates maps redundant copies to the copy kept, see dedup.find_duplicates;
+    # dedup says what happens to them: "skip" leaves them where they are,
+    # "move" puts them in Duplicates/, "hardlink" organizes them as links to the kept copy
+    started = time.perf_counter()
+    categories = classify_entries(entries, rules, sniff)
+    dates = resolve_dates(entries, index)
+    if metrics is not None:
+        metrics.add("classify", len(entries), sum(st.st_size for _, st in entries), time.perf_counter() - started)
+    duplicates = duplicates or {}
+    planned = {path for path, _ in entries} if duplicates and dedup == "hardlink" else ()
+    for (path, st), category in zip(entries, categories):
+        item = os.path.basename(path)
+        kept = duplicates.get(path)
+        if kept is not None:
+            plan.duplicates += 1
+            if dedup == "skip":
+                continue
+            if dedup == "move":
+                new_path = destinations.claim(os.path.join(plan.folder_path, DUPLICATES_FOLDER), item)
+                plan.add(path, new_path, DUPLICATES_FOLDER, st.st_size, st.st_mtime_ns, st.st_ino)
+                continue
+            if dedup == "hardlink" and kept not in planned and kept not in plan.kept:
+                # Kept copy organized by an earlier run: remember which version was compared
+                try:
+                    kept_st = os.stat(kept)
+                except OSError:
+                    kept = None
+                else:
+                    plan.kept[kept] = (kept_st.st_size, kept_st.st_mtime_ns, kept_st.st_ino)
+        category, year_folder, month_folder, size_group = destination_parts(item, st, rules, category,
+                                                                            dates.get(path))
+
+        category_folder = os.path.join(plan.folder_path, category, year_folder, month_folder, size_group)
+        # Handle duplicate names
+        new_path = destinations.claim(category_folder, item)
+        plan.add(path, new_path, category, st.st_size, st.st_mtime_ns, st.st_ino, kept)
+    return plan
+
+def organized_copies(username, folder_path, entries):
+    # Files earlier runs filed into this folder with a size the scan found.
+    # The scan no longer sees them, but a new arrival may duplicate one.
+    # -> ([(path, stat)], {path: full digest still valid})
+    sizes = {st.st_size for _, st in entries if st.st_size}
+    if not sizes:
+        return [], {}
+    with open_index() as index:
+        rows = index.organized_by_size(username, folder_path, sizes)
+    copies = []
+    hashes = {}
+    for path, size, mtime_ns, ino, category, digest in rows:
+        if category == DUPLICATES_FOLDER:
+            continue
         try:
-            skip_text = self.skip_entry.get().strip()
-            skip_exts = [s.strip().lower() for s in skip_text.split(",")] if skip_text else []
-            
-            # Create backup
-            self.root.after(0, lambda: self.progress_var.set("Creating backup..."))
-            backup_path = backup_folder(self.current_user, folder_path)
-            
-            # Organize files
-            self.root.after(0, lambda: self.progress_var.set("Organizing files..."))
-            
-            moved_files = []
-            summary = {}
-            
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isfile(item_path):
-                    ext = os.path.splitext(item)[1]
-                    if ext.lower() in skip_exts:
-                        continue
-
-                    category = get_category(ext)
-                    size = os.path.getsize(item_path)
-                    size_group = get_size_group(size)
-
-                    creation_time = datetime.fromtimestamp(os.path.getctime(item_path))
-                    year_folder = str(creation_time.year)
-                    month_folder = f"{creation_time.month:02}"
-
-                    category_folder = os.path.join(folder_path, category, year_folder, month_folder, size_group)
-                    os.makedirs(category_folder, exist_ok=True)
-
-                    # Handle duplicate names
-                    base, extension = os.path.splitext(item)
-                    new_path = os.path.join(category_folder, item)
-                    counter = 1
-                    while os.path.exists(new_path):
-                        new_path = os.path.join(category_folder, f"{base}_{counter}{extension}")
-                        counter += 1
-
-                    shutil.move(item_path, new_path)
-                    moved_files.append((new_path, folder_path))
-
-                    summary[category] = summary.get(category, 0) + 1
-                    create_log(self.current_user, f"Moved: {item} → {category}/{year_folder}/{month_folder}/{size_group}")
-
-            # Save undo information
-            if moved_files:
-                with open(UNDO_FILE, "w") as f:
-                    json.dump({"user": self.current_user, "files": moved_files}, f)
-
-            # Show results
-            self.root.after(0, lambda: self.show_organization_results(summary, backup_path))
-            
-        except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Organization failed: {str(e)}"))
-        finally:
-            self.root.after(0, lambda: self.progress_bar.stop())
-    
-    def show_organization_results(self, summary, backup_path):
-        self.progress_bar.stop()
-        self.progress_var.set("Organization complete!")
-        
-        if summary:
-            result_text = "Organization Summary:\n\n"
-            for category, count in summary.items():
-                result_text += f"• {category}: {count} file(s)\n"
-            result_text += f"\nBackup created at:\n{backup_path}"
-            messagebox.showinfo("Success", result_text)
-        else:
-            messagebox.showinfo("Info", "No files were organized.")
-    
-    def undo_operation(self):
-        if not os.path.exists(UNDO_FILE):
-            messagebox.showerror("Error", "No undo history found!")
-            return
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size != size:
+            continue
+        copies.append((path, st))
+        if digest and (st.st_mtime_ns, st.st_ino) == (mtime_ns, ino):
+            hashes[path] = digest
+    return copies, hashes
+
+def dedup_entries(entries, metrics=None, username=None, folder_path=None):
+    # Compared against each other and against what earlier runs organized,
+    # so a copy skipped once stays skipped on the next run
+    organized, hashes = organized_copies(username, folder_path, entries) if username else ([], {})
+    known = set(hashes)
+    if metrics is None:
+        duplicates = find_duplicates(entries, organized=organized, hashes=hashes)
+    else:
+        with metrics.phase("dedup"):
+            duplicates = find_duplicates(entries, on_hash=lambda nbytes, seconds: metrics.add("dedup", 1, nbytes, seconds),
+                                         organized=organized, hashes=hashes)
+    # Full digests of organized copies are kept for next time
+    fresh = [(path, st.st_size, st.st_mtime_ns, hashes[path]) for path, st in organized
+             if path in hashes and path not in known]
+    if fresh:
+        with open_index() as index:
+            index.set_hashes(fresh)
+    return duplicates
+
+def open_index():
+    from file_index import FileIndex
+    return FileIndex(INDEX_FILE)
+
+def skip_organized(entries):
+    # Files this tool already placed and that haven't changed since stay put
+    with open_index() as index:
+        known = index.lookup(path for path, _ in entries)
+    if not known:
+        return entries
+    kept = []
+    for path, st in entries:
+        row = known.get(path)
+        if row and row[4] and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+            continue
+        kept.append((path, st))
+    return kept
+
+def plan_folder(username, folder_path, skip_exts=(), recursive=False, max_depth=None, exclude=(),
+                sniff=False, create_dirs=False, metrics=None, dedup=None):
+    folder_path = os.path.abspath(folder_path)
+    rules = load_rules(username, folder_path)
+    entries = scan_folder(folder_path, skip_exts, recursive, max_depth, exclude,
+                          category_folders=rules.folders, metrics=metrics)
+    # The walk returns directories in completion order; sorting keeps the
+    # _1, _2 suffixes on the same files every run, so plans can be diffed
+    entries = sorted(skip_organized(entries), key=lambda entry: entry[0])
+    if metrics is not None:
+        metrics.finish("scan")
+    duplicates = dedup_entries(entries, metrics, username, folder_path) if dedup else None
+    if metrics is not None:
+        metrics.start("classify", len(entries), sum(st.st_size for _, st in entries))
+    plan = plan_entries(MovePlan(folder_path), entries, rules, DestinationIndex(create=create_dirs), sniff, metrics,
+                        duplicates, dedup)
+    if metrics is not None:
+        metrics.finish("classify")
+    return plan
+
+def source_unchanged(src, size, mtime_ns, ino):
+    try:
+        st = os.stat(src)
+    except FileNotFoundError:
+        return False
+    return st.st_size == size and st.st_mtime_ns == mtime_ns and st.st_ino == ino
+
+def execute_rows(plan, rows, destinations, log, summary, verify=False, index=None, username=None, executor=None,
+                 metrics=None):
+    skipped = 0
+    for i in rows:
+        row = plan.row(i)
+        src, new_path, category, size, mtime_ns, ino = row
+        if verify:
+            # Saved plan: the file must still be the one that was planned
+            if not source_unchanged(src, size, mtime_ns, ino):
+                skipped += 1
+                log.write(f"Skipped (changed since planning): {os.path.basename(src)}", action="skip", src=src)
+                continue
+            # The planned name may have been taken since
+            new_path = destinations.claim(*os.path.split(new_path))
+            row = (src, new_path) + row[2:]
+
+        # The executor journals the move (see move_executor) and takes the
+        # next free name if new_path has been taken since it was claimed
+        executor.move(src, new_path, row)
+
+    # Renames are done by now, cross-device copies are reported as they finish
+    record_moves(plan, executor.completed(), log, summary, index, username, metrics)
+    return skipped + skip_vanished(executor, log)
+
+def move_executor(run_journal, destinations, metrics):
+    # Every move is journaled once its destination holds the file and before
+    # the source goes, so a kill at any point still leaves an undo record
+    def next_name(src, dest, row):
+        new_path = destinations.claim_after(dest, os.path.basename(src))
+        return new_path, (src, new_path) + row[2:]
+    return MoveExecutor(on_move=lambda seconds: metrics.sample("move", seconds), next_name=next_name,
+                        on_claim=lambda src, dest: run_journal.record("move", src=src, dest=dest))
+
+def skip_vanished(executor, log):
+    # Sources deleted since planning: skipped like a changed file, nothing was journaled for them
+    missing = executor.vanished()
+    for row in missing:
+        log.write(f"Skipped (gone since planning): {os.path.basename(row[0])}", action="skip", src=row[0])
+    return len(missing)
+
+def record_moves(plan, moved, log, summary, index=None, username=None, metrics=None):
+    indexed = []
+    started = time.perf_counter()
+    for src, new_path, category, size, mtime_ns, ino in moved:
+        summary[category] = summary.get(category, 0) + 1
+        rel_dir = os.path.relpath(os.path.dirname(new_path), plan.folder_path).replace(os.sep, "/")
+        log.write(f"Moved: {os.path.basename(src)} → {rel_dir}",
+                  action="move", src=src, dest=new_path, category=category, size=size)
+        indexed.append((new_path, category, size, mtime_ns, ino, None, True))
+    if metrics is not None and moved:
+        metrics.add("move", len(moved), sum(m[3] for m in moved))
+        metrics.add("log", len(moved), 0, time.perf_counter() - started)
+
+    # One transaction per batch
+    if index is not None and indexed:
+        index.record(username, plan.folder_path, indexed, moved_from=[m[0] for m in moved])
 
+def record_finished(plan, executor, log, summary, index=None, username=None, metrics=None):
+    # On the way out of a failed run: the moves that did happen still belong
+    # in the log and the index, without hiding the error that stopped the run
+    try:
+        record_moves(plan, executor.finished(), log, summary, index, username, metrics)
+    except Exception:
+        pass
+
+def link_rows(plan, log, run_journal):
+    # Before anything moves, replace the planned duplicates with hardlinks to
+    # the copies kept. Both files must still be the ones that were hashed.
+    kept_rows = {}
+    wanted = set(plan.links.values())
+    for i in range(len(plan)):
+        src = plan.row(i)[0]
+        if src in wanted:
+            kept_rows[src] = i
+    linked = 0
+    for i, kept_src in plan.links.items():
+        src, _, _, size, mtime_ns, ino = plan.row(i)
+        k = kept_rows.get(kept_src)
+        kept_version = plan.row(k)[3:] if k is not None else plan.kept.get(kept_src)
+        if (kept_version is None or not source_unchanged(src, size, mtime_ns, ino)
+                or not source_unchanged(kept_src, *kept_version)):
+            log.write(f"Not linked (changed since planning): {os.path.basename(src)}", action="skip", src=src)
+            continue
+        # Journal first; undo gives the file its own data, mode and mtime back
+        # (appended rather than recorded, the run's count is of moves)
+        run_journal.append({"op": "link", "path": src, "target": kept_src, "mode": os.stat(src).st_mode & 0o7777,
+                            "mtime_ns": mtime_ns})
+        try:
+            link_duplicate(src, kept_src)
+        except OSError as e:
+            # Across devices, or a filesystem without hardlinks: organize it as a copy
+            log.write(f"Not linked ({e.strerror}): {os.path.basename(src)}", action="skip", src=src)
+            continue
+        # The row now describes the shared inode
+        st = os.stat(src)
+        plan.mtime_ns[i] = st.st_mtime_ns
+        plan.ino[i] = st.st_ino
+        log.write(f"Linked duplicate: {os.path.basename(src)} → {os.path.basename(kept_src)}",
+                  action="link", src=src, dest=kept_src, size=size)
+        linked += 1
+    return linked
+
+def execute_plan(username, plan, verify=True, batch_size=EXECUTE_BATCH, on_batch=None, metrics=None):
+    summary = {}
+    skipped = 0
+    destinations = DestinationIndex()
+    if metrics is None:
+        metrics = RunMetrics()
+
+    log = open_log(username)
+    index = open_index()
+    run_journal = RunJournal.create(user_journal_dir(username), username, plan.folder_path)
+    executor = move_executor(run_journal, destinations, metrics)
+    metrics.start("move", len(plan), plan.total_bytes())
+    try:
+        if plan.links:
+            link_rows(plan, log, run_journal)
+            run_journal.sync()
+        for start in range(0, len(plan), batch_size):
+            rows = range(start, min(start + batch_size, len(plan)))
+            skipped += execute_rows(plan, rows, destinations, log, summary, verify, index, username, executor,
+                                    metrics)
+            run_journal.sync()
+            if on_batch:
+                on_batch(rows.stop, len(plan))
+        record_moves(plan, executor.drain(), log, summary, index, username, metrics)
+        skipped += skip_vanished(executor, log)
+    except BaseException:
+        # Let copies already under way finish, their journal records are written
+        executor.close()
+        record_finished(plan, executor, log, summary, index, username, metrics)
+        close_run(run_journal, interrupted=True)
+        raise
+    else:
+        close_run(run_journal)
+    finally:
+        executor.close()
+        log.close()
+        index.close()
+        metrics.close()
+        dump_metrics(metrics, username, run_journal.run_id, "organize", folder=plan.folder_path,
+                     moved=run_journal.count, skipped=skipped)
+
+    return summary, skipped
+
+def dump_metrics(metrics, username, run_id, kind, **fields):
+    return metrics.dump(os.path.join(METRICS_DIR, username, f"{run_id}-{kind}.json"),
+                        run=run_id, user=username, kind=kind, io=governor.current().snapshot(), **fields)
+
+def load_io_limits():
+    try:
+        with open(IO_LIMITS_FILE, "r") as f:
+            limits = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {key: limits[key] for key in IO_LIMIT_KEYS if limits.get(key) is not None}
+
+def apply_io_limits(limits=None):
+    # Every copy, rename and hash in this process from now on goes through these
+    return governor.configure(**(load_io_limits() if limits is None else limits))
+
+def backup_plan(username, plan, metrics=None):
+    entries = []
+    for src, _, _, _, _, _ in plan:
+        try:
+            entries.append((src, os.stat(src)))
+        except FileNotFoundError:
+            continue
+    return backup_entries(username, plan.folder_path, entries, metrics)
+
+def close_run(run_journal, interrupted=False):
+    run_journal.close(moved=run_journal.count, interrupted=interrupted)
+    if not run_journal.count and not interrupted:
+        os.remove(run_journal.path)
+
+def organize_folder(username, folder_path, skip_exts=(), recursive=False, max_depth=None, exclude=(),
+                    sniff=False, metrics=None, dedup=None):
+    # Plan and execute in one go; nothing changed in between, so no re-check
+    if metrics is None:
+        metrics = RunMetrics()
+    plan = plan_folder(username, folder_path, skip_exts, recursive, max_depth, exclude, sniff, create_dirs=True,
+                       metrics=metrics, dedup=dedup)
+    summary, _ = execute_plan(username, plan, verify=False, metrics=metrics)
+    return summary
+
+def watch_folder(username, folder_path, skip_exts=(), exclude=(), sniff=False, on_batch=None,
+                 watcher=None, metrics=None):
+    # Organize files in the top level of folder_path as they arrive. The whole
+    # session is one journaled run, so it can be undone like any other.
+    folder_path = os.path.abspath(folder_path)
+    skip = {e.lower() for e in skip_exts}
+    exclude = tuple(exclude)
+
+    def ignore(name):
+        return (name == RULES_FILENAME or os.path.splitext(name)[1].lower() in skip
+                or any(fnmatch.fnmatch(name, p) for p in exclude))
+
+    # Callers that need to stop the session pass their own watcher
+    if watcher is None:
+        from watcher import FolderWatcher
+        watcher = FolderWatcher(folder_path, settle=WATCH_SETTLE)
+    watcher.ignore = ignore
+    summary = {}
+    rules = load_rules(username, folder_path)
+    log = open_log(username)
+    index = open_index()
+    if metrics is None:
+        metrics = RunMetrics()
+    run_journal = RunJournal.create(user_journal_dir(username), username, folder_path)
+    # Only consulted when a planned name was taken after its batch was planned
+    executor = move_executor(run_journal, DestinationIndex(), metrics)
+    plan = None
+    try:
+        # Pick up whatever is already there, then wait for new arrivals
+        existing = sorted(scan_folder(folder_path, skip_exts, exclude=exclude, metrics=metrics),
+                          key=lambda entry: entry[0])
+        metrics.finish("scan")
+        batches = itertools.chain([existing], watcher.batches())
+        for batch in batches:
+            if not batch:
+                continue
+            # Fresh index per batch, the folder may have changed while we were idle
+            plan = plan_entries(MovePlan(folder_path), batch, rules, DestinationIndex(), sniff, metrics,
+                                index=index)
+            execute_rows(plan, range(len(plan)), None, log, summary, index=index, username=username,
+                         executor=executor, metrics=metrics)
+            record_moves(plan, executor.drain(), log, summary, index, username, metrics)
+            skip_vanished(executor, log)
+            log.flush()
+            run_journal.sync()
+            if on_batch:
+                on_batch(len(batch), dict(summary))
+    except BaseException:
+        executor.close()
+        if plan is not None:
+            record_finished(plan, executor, log, summary, index, username, metrics)
+        close_run(run_journal, interrupted=True)
+        raise
+    else:
+        close_run(run_journal)
+    finally:
+        executor.close()
+        log.close()
+        index.close()
+        watcher.close()
+        metrics.close()
+        dump_metrics(metrics, username, run_journal.run_id, "watch", folder=folder_path, moved=run_journal.count)
+
+    return summary
+
+def user_journal_dir(username):
+    return os.path.join(JOURNAL_DIR, username)
+
+def list_runs(username):
+    return journal.list_runs(user_journal_dir(username))
+
+def recover_runs(username):
+    # Carry over a pending undo file from older versions as a journaled run
+    if os.path.exists(UNDO_FILE):
         with open(UNDO_FILE, "r") as f:
             data = json.load(f)
+        if data["user"] == username:
+            legacy = RunJournal.create(user_journal_dir(username), username,
+                                       os.path.commonpath([folder for _, folder in data["files"]]))
+            for new_path, original_folder in data["files"]:
+                legacy.record("move", src=os.path.join(original_folder, os.path.basename(new_path)), dest=new_path)
+            legacy.close(moved=legacy.count)
+            os.remove(UNDO_FILE)
+    return journal.recover_runs(user_journal_dir(username))
+
+def undo_moves(moves, destinations, executor, metrics=None):
+    # Returns (dest, original_path) for every move back that has finished
+    restored = []
+    pending = set()
+    # Newest first, so a file moved twice in one run ends up where it started
+    for record in reversed(moves):
+        if record["dest"] in pending:
+            # Still being copied back from another device
+            drained = executor.drain()
+            if metrics is not None:
+                metrics.add("undo", len(drained))
+            restored.extend(drained)
+        if not os.path.exists(record["dest"]):
+            continue
+        src_dir, filename = os.path.split(record["src"])
+        # Handle duplicates in original folder
+        original_path = destinations.claim(src_dir, filename)
+        executor.move(record["dest"], original_path, (record["dest"], original_path))
+        pending.add(original_path)
+    done = executor.completed()
+    if metrics is not None:
+        metrics.add("undo", len(done))
+    restored.extend(done)
+    return restored
+
+def undo_run(username, run_id, workers=8, metrics=None):
+    path = os.path.join(user_journal_dir(username), f"{run_id}.jsonl")
+    header, records, footer, undone = journal.read_run(path)
+    if undone is not None:
+        return 0
+    if footer is None and journal.run_is_live(path):
+        raise RuntimeError("This run is still in progress")
+
+    # Hardlinked duplicates get their own data back where they ended up, before moving back
+    moved_to = {record["src"]: record["dest"] for record in records if record["op"] == "move"}
+    unlinked = []
+    def current_path(src):
+        dest = moved_to.get(src)
+        return dest if dest and os.path.exists(dest) else src
+
+    for record in reversed(records):
+        if record["op"] == "link":
+            linked_path = current_path(record["path"])
+            if unlink_duplicate(linked_path, current_path(record["target"]), record["mode"], record["mtime_ns"]):
+                unlinked.append(linked_path)
+
+    # One worker per original directory, files within a directory go in order
+    by_dir = {}
+    for record in records:
+        if record["op"] == "move":
+            by_dir.setdefault(os.path.dirname(record["src"]), []).append(record)
+
+    destinations = DestinationIndex()
+    if metrics is None:
+        metrics = RunMetrics()
+    metrics.start("undo", sum(len(moves) for moves in by_dir.values()))
+    def next_name(src, dest, moved):
+        # Something took the original name while the run was being undone
+        new_path = destinations.claim_after(dest, os.path.basename(dest))
+        return new_path, (src, new_path)
+    executor = MoveExecutor(on_move=lambda seconds: metrics.sample("undo", seconds), next_name=next_name)
+    from concurrent.futures import ThreadPoolExecutor
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            moved = [m for done in pool.map(lambda moves: undo_moves(moves, destinations, executor, metrics),
+                                            by_dir.values())
+                     for m in done]
+        drained = executor.drain()
+        metrics.add("undo", len(drained))
+        moved += drained
+    finally:
+        executor.close()
+        metrics.close()
+        dump_metrics(metrics, username, run_id, "undo", folder=(header or {}).get("folder"))
 
-        if data["user"] != self.current_user:
-            messagebox.showerror("Error", "You can only undo your own last operation!")
-            return
+    restored = []
+    with open_log(username) as log:
+        for linked_path in unlinked:
+            log.write(f"Unlinked duplicate: {os.path.basename(linked_path)}", action="unlink", src=linked_path)
+        for dest, original_path in moved:
+            log.write(f"Restored: {os.path.basename(original_path)}", action="restore", src=dest, dest=original_path)
+            restored.append(dest)
+    with open_index() as index:
+        index.forget(restored)
+    journal.mark_undone(path, len(restored))
+    return len(restored)
 
-        if messagebox.askyesno("Confirm", "Are you sure you want to undo the last organization?"):
+# Jobs: the same work as above, queued on a JobScheduler so several users and
+# folders can be processed at once. Each job locks the folder it changes.
+def make_scheduler(workers=JOB_WORKERS):
+    return JobScheduler(workers, LOCK_DIR)
+
+def organize_job(username, folder_path, skip_exts=(), recursive=False, max_depth=None, exclude=(), sniff=False,
+                 metrics=None, dedup=None):
+    # Backup first, then organize, like the Organize button
+    backup_path = backup_folder(username, folder_path, recursive, max_depth, exclude, metrics)
+    summary = organize_folder(username, folder_path, skip_exts, recursive, max_depth, exclude, sniff, metrics, dedup)
+    return summary, backup_path
+
+def plan_job(username, plan, metrics=None):
+    backup_path = backup_plan(username, plan, metrics)
+    summary, skipped = execute_plan(username, plan, metrics=metrics)
+    return summary, skipped, backup_path
+
+def submit_organize(scheduler, username, folder_path, on_done=None, metrics=None, **options):
+    metrics = metrics or RunMetrics()
+    return scheduler.submit("organize", username, [folder_path], organize_job, username, folder_path,
+                            progress=metrics, on_done=on_done, metrics=metrics, **options)
+
+def submit_plan(scheduler, username, plan, on_done=None, metrics=None):
+    metrics = metrics or RunMetrics()
+    return scheduler.submit("organize", username, [plan.folder_path], plan_job, username, plan,
+                            progress=metrics, on_done=on_done, metrics=metrics)
+
+def submit_backup(scheduler, username, folder_path, on_done=None, metrics=None, **options):
+    metrics = metrics or RunMetrics()
+    return scheduler.submit("backup", username, [folder_path], backup_folder, username, folder_path,
+                            progress=metrics, on_done=on_done, metrics=metrics, **options)
+
+def submit_undo(scheduler, username, run_id, on_done=None, metrics=None):
+    header, _, _, _ = journal.read_run(os.path.join(user_journal_dir(username), f"{run_id}.jsonl"))
+    folders = [header["folder"]] if header and header.get("folder") else []
+    metrics = metrics or RunMetrics()
+    return scheduler.submit("undo", username, folders, undo_run, username, run_id,
+                            progress=metrics, on_done=on_done, metrics=metrics)
+
+# Headless runs: `python organizer.py <folder>...` or `--manifest folders.txt`
+# for a sweep over many folders. Folders are grouped by the device they live
+# on and each device gets its own worker processes, so two disks are worked in
+# parallel but one disk never thrashes between folders. Every folder prints
+# one JSON line when it finishes.
+CLI_OPTIONS = ("recursive", "max_depth", "exclude", "skip", "sniff", "dedup", "backup", "dry_run")
+
+def read_manifest(path):
+    # One folder per line, or a JSON object per line with "path" plus any of
+    # "user" and CLI_OPTIONS to override the command line for that folder
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        entries = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                if "path" not in entry:
+                    raise ValueError(f"Manifest entry without a path: {line}")
+                entries.append(entry)
+            else:
+                entries.append({"path": line})
+        return entries
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def folder_result(username, folder_path, status="done", error=None):
+    return {"folder": folder_path, "user": username, "device": None, "status": status, "files": 0, "bytes": 0,
+            "categories": {}, "skipped": 0, "duplicates": 0, "backup": None, "seconds": None, "error": error}
+
+def organize_entry(username, folder_path, options, io_limits=None):
+    # Runs in a worker process; never raises, the result says what happened
+    if io_limits is not None:
+        apply_io_limits(io_limits)
+    started = time.perf_counter()
+    result = folder_result(username, folder_path)
+    locks = FolderLocks(LOCK_DIR)
+    held = locks.acquire([folder_path])
+    if held is None:
+        # Another organizer (GUI job, watch mode, an earlier sweep) has it
+        result["status"] = "busy"
+        return result
+    try:
+        metrics = RunMetrics()
+        skip_exts = tuple(options.get("skip") or ())
+        exclude = tuple(options.get("exclude") or ())
+        recursive = bool(options.get("recursive"))
+        max_depth = options.get("max_depth")
+        plan = plan_folder(username, folder_path, skip_exts, recursive, max_depth, exclude,
+                           bool(options.get("sniff")), create_dirs=not options.get("dry_run"), metrics=metrics,
+                           dedup=options.get("dedup"))
+        result["duplicates"] = plan.duplicates
+        if options.get("dry_run"):
+            result["status"] = "planned"
+            result["files"] = len(plan)
+            result["bytes"] = plan.total_bytes()
+            for _, _, category, _, _, _ in plan:
+                result["categories"][category] = result["categories"].get(category, 0) + 1
+        else:
+            if options.get("backup", True) and len(plan):
+                result["backup"] = backup_plan(username, plan, metrics)
+            summary, skipped = execute_plan(username, plan, verify=False, metrics=metrics)
+            moved = metrics.snapshot()["phases"].get("move", {})
+            result["files"] = sum(summary.values())
+            result["bytes"] = moved.get("bytes", 0)
+            result["categories"] = summary
+            result["skipped"] = skipped
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        locks.release(held)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def folder_device(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+def organize_many(jobs, per_device=1, io_limits=None):
+    # jobs: (username, folder_path, options); yields results as folders finish.
+    # io_limits are per device, shared out between that device's processes.
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    by_device = {}
+    for username, folder_path, options in jobs:
+        by_device.setdefault(folder_device(folder_path), []).append((username, folder_path, options))
+    pools = []
+    futures = {}
+    try:
+        for device, device_jobs in by_device.items():
+            if device is None:
+                for username, folder_path, _ in device_jobs:
+                    yield folder_result(username, folder_path, "failed", "Folder not found")
+                continue
+            workers = min(per_device, len(device_jobs))
+            limits = dict(io_limits or {})
+            for key in ("mb_per_s", "ops_per_s"):
+                if limits.get(key):
+                    limits[key] /= workers
+            pool = ProcessPoolExecutor(max_workers=workers)
+            pools.append(pool)
+            for username, folder_path, options in device_jobs:
+                futures[pool.submit(organize_entry, username, folder_path, options, limits)] = (
+                    device, username, folder_path)
+        for future in as_completed(futures):
+            device, username, folder_path = futures[future]
             try:
-                restored_count = 0
-                for new_path, original_folder in data["files"]:
-                    if os.path.exists(new_path):
-                        filename = os.path.basename(new_path)
-                        original_path = os.path.join(original_folder, filename)
-                        
-                        # Handle duplicates in original folder
-                        counter = 1
-                        while os.path.exists(original_path):
-                            base, ext = os.path.splitext(filename)
-                            original_path = os.path.join(original_folder, f"{base}_{counter}{ext}")
-                            counter += 1
-                        
-                        shutil.move(new_path, original_path)
-                        create_log(self.current_user, f"Restored: {filename}")
-                        restored_count += 1
-
-                os.remove(UNDO_FILE)
-                messagebox.showinfo("Success", f"Undo complete! Restored {restored_count} files.")
-                
+                result = future.result()
             except Exception as e:
-                messagebox.showerror("Error", f"Undo failed: {str(e)}")
-    
-    def show_log_screen(self):
-        self.clear_window()
-        
-        # Main frame
-        main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
-        
-        # Header
-        header_frame = tk.Frame(main_frame, bg="#9b59b6")
-        header_frame.pack(fill="x", pady=(0, 20))
-        
-        tk.Label(header_frame, text="📜 Activity Log", 
-                font=("Arial", 18, "bold"), bg="#9b59b6", fg="white").pack(pady=15)
-        
-        # Log display frame
-        log_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
-        log_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
-        
-        # Scrolled text widget
-        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, 
-                                                 font=("Courier", 10), 
-                                                 bg="#f8f9fa", fg="#2c3e50")
-        self.log_text.pack(fill="both", expand=True, padx=20, pady=20)
-        
-        # Load and display log
-        self.load_log()
-        
-        # Back button
-        back_btn = tk.Button(main_frame, text="← Back", command=self.show_main_menu,
-                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
-                           padx=20, pady=10, cursor="hand2")
-        back_btn.pack()
-    
-    def load_log(self):
-        log_file = os.path.join(DATA_DIR, "logs", f"{self.current_user}_log.txt")
-        if not os.path.exists(log_file):
-            self.log_text.insert("1.0", "No activity log found. Start organizing files to see activity here!")
-            self.log_text.config(state="disabled")
-            return
-        
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                log_content = f.read()
-                if log_content.strip():
-                    self.log_text.insert("1.0", log_content)
-                else:
-                    self.log_text.insert("1.0", "Activity log is empty. Start organizing files to see activity here!")
-        except Exception as e:
-            self.log_text.insert("1.0", f"Error reading log file: {str(e)}")
-        
-        self.log_text.config(state="disabled")
-    
-    def logout(self):
-        if messagebox.askyesno("Confirm", "Are you sure you want to logout?"):
-            self.current_user = None
-            self.show_login_screen()
-    
-    def run(self):
-        self.root.mainloop()
+                # The worker process itself died
+                result = folder_result(username, folder_path, "failed", f"{type(e).__name__}: {e}")
+            result["device"] = device
+            yield result
+    finally:
+        for pool in pools:
+            pool.shutdown(cancel_futures=True)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        from organizer_gui import FileOrganizerGUI
+        FileOrganizerGUI().run()
+        return 0
+
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(prog="organizer.py", description="Sort files into category folders.")
+    parser.add_argument("folders", nargs="*", help="folders to organize")
+    parser.add_argument("--manifest", help="file listing folders, one per line or JSON per line ('-' for stdin)")
+    parser.add_argument("--user", default=getpass.getuser(), help="account that owns logs, backups and undo")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--exclude", action="append", default=[], help="glob to leave alone, repeatable")
+    parser.add_argument("--skip", action="append", default=[], help="extension to leave alone, e.g. .tmp")
+    parser.add_argument("--sniff", action="store_true", help="detect types by content as well as extension")
+    parser.add_argument("--dedup", choices=DEDUP_ACTIONS,
+                        help="find duplicate files and skip them, hardlink them or move them to Duplicates/")
+    parser.add_argument("--no-backup", dest="backup", action="store_false")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+    parser.add_argument("--per-device", type=int, default=1, help="folders worked at once on each device")
+    parser.add_argument("--mb-per-s", type=float, help="I/O bandwidth cap per device")
+    parser.add_argument("--ops-per-s", type=float, help="I/O operations cap per device")
+    parser.add_argument("--latency-target-ms", type=float,
+                        help="work fewer files at once while storage answers slower than this")
+    parser.add_argument("--io-class", choices=sorted(governor.IO_CLASSES), help="ionice class (Linux)")
+    args = parser.parse_args(argv)
+
+    entries = [{"path": folder} for folder in args.folders]
+    if args.manifest:
+        entries += read_manifest(args.manifest)
+    if not entries:
+        parser.error("no folders given")
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth must be 0 or more")
+
+    defaults = {name: getattr(args, name) for name in CLI_OPTIONS}
+    jobs = []
+    for entry in entries:
+        options = dict(defaults)
+        options.update((name, entry[name]) for name in CLI_OPTIONS if name in entry)
+        options["skip"] = [ext if ext.startswith(".") else "." + ext for ext in options["skip"]]
+        jobs.append((entry.get("user", args.user), os.path.abspath(os.path.expanduser(entry["path"])), options))
+
+    invalid = sorted({username for username, _, _ in jobs if not valid_username(username)})
+    if invalid:
+        parser.error(f"invalid username: {invalid[0]}")
+
+    ensure_data_dirs()
+    for username in sorted({username for username, _, _ in jobs}):
+        recover_runs(username)
+
+    io_limits = load_io_limits()
+    io_limits.update((key, getattr(args, key)) for key in IO_LIMIT_KEYS if getattr(args, key) is not None)
+
+    failed = 0
+    for result in organize_many(jobs, max(1, args.per_device), io_limits):
+        failed += result["status"] in ("failed", "busy")
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    app = FileOrganizerGUI()
-    app.run()
\ No newline at end of file
+    sys.exit(main())
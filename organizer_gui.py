@@ -0,0 +1,974 @@
+import os
+import time
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog, scrolledtext
+from tkinter import font as tkfont
+from organizer import (DATA_DIR, SEARCH_LIMIT, WATCH_SETTLE, ensure_data_dirs, load_user, create_user,
+                       list_backups, restore_backup, plan_folder, watch_folder, list_runs, recover_runs,
+                       open_index, make_scheduler, submit_organize, submit_plan, submit_undo, apply_io_limits)
+from metrics import RunMetrics, format_progress
+import governor
+from plan import MovePlan, diff_plans
+from watcher import FolderWatcher
+from log_view import LogIndex
+
+# Tk front end for organizer.py. Only imported when the app runs with a
+# display, the organizer core itself never touches tkinter.
+PREVIEW_ROWS = 500
+# How often the GUI redraws progress, however fast files are moving
+PROGRESS_INTERVAL_MS = 250
+# Labels for the duplicates option and the dedup action each one means
+DEDUP_CHOICES = [("Organize like any other file", None), ("Leave in place", "skip"),
+                 ("Hardlink to the copy kept", "hardlink"), ("Move to Duplicates folder", "move")]
+PHASE_LABELS = {"backup": "Backing up", "scan": "Scanning", "dedup": "Finding duplicates", "classify": "Classifying",
+                "move": "Moving", "log": "Logging", "undo": "Restoring"}
+
+class FileOrganizerGUI:
+    def __init__(self):
+        self.root = tk.Tk()
+        self.root.title("File Organizer")
+        self.root.geometry("800x600")
+        self.root.configure(bg="#f0f0f0")
+        
+        # Configure styles
+        self.style = ttk.Style()
+        self.style.theme_use('clam')
+        
+        self.current_user = None
+        self.watcher = None
+        ensure_data_dirs()
+        apply_io_limits()
+        self.scheduler = make_scheduler()
+        
+        # Initialize with login screen
+        self.show_login_screen()
+        
+    def clear_window(self):
+        for widget in self.root.winfo_children():
+            widget.destroy()
+    
+    def show_login_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Title
+        title_label = tk.Label(main_frame, text="📁 File Organizer", 
+                              font=("Arial", 24, "bold"), bg="#f0f0f0", fg="#2c3e50")
+        title_label.pack(pady=(50, 30))
+        
+        # Login form frame
+        form_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        form_frame.pack(pady=20, padx=100, fill="x")
+        
+        tk.Label(form_frame, text="Login / Register", font=("Arial", 16, "bold"), 
+                bg="#ffffff", fg="#34495e").pack(pady=20)
+        
+        # Username field
+        tk.Label(form_frame, text="Username:", font=("Arial", 10), 
+                bg="#ffffff").pack(pady=(10, 5))
+        self.username_entry = tk.Entry(form_frame, font=("Arial", 12), width=30)
+        self.username_entry.pack(pady=(0, 10))
+        
+        # Password field
+        tk.Label(form_frame, text="Password:", font=("Arial", 10), 
+                bg="#ffffff").pack(pady=(10, 5))
+        self.password_entry = tk.Entry(form_frame, font=("Arial", 12), width=30, show="*")
+        self.password_entry.pack(pady=(0, 20))
+        
+        # Buttons frame
+        buttons_frame = tk.Frame(form_frame, bg="#ffffff")
+        buttons_frame.pack(pady=(0, 20))
+        
+        login_btn = tk.Button(buttons_frame, text="Login", command=self.login,
+                             bg="#3498db", fg="white", font=("Arial", 12, "bold"),
+                             padx=20, pady=8, cursor="hand2")
+        login_btn.pack(side="left", padx=(0, 10))
+        
+        register_btn = tk.Button(buttons_frame, text="Register", command=self.register,
+                               bg="#2ecc71", fg="white", font=("Arial", 12, "bold"),
+                               padx=20, pady=8, cursor="hand2")
+        register_btn.pack(side="left")
+        
+        # Bind Enter key to login
+        self.root.bind('<Return>', lambda e: self.login())
+        
+    def login(self):
+        username = self.username_entry.get().strip()
+        password = self.password_entry.get().strip()
+        
+        if not username or not password:
+            messagebox.showerror("Error", "Please enter both username and password!")
+            return
+        
+        user = load_user(username)
+        if user is not None and user["password"] == password:
+            self.current_user = username
+            messagebox.showinfo("Success", f"Welcome, {username}!")
+            recovered = recover_runs(username)
+            if recovered:
+                messagebox.showwarning("Interrupted Runs", f"{len(recovered)} organize run(s) were interrupted. "
+                                       "They can be undone from Undo History.")
+            self.show_main_menu()
+        else:
+            messagebox.showerror("Error", "Invalid credentials!")
+    
+    def register(self):
+        username = self.username_entry.get().strip()
+        password = self.password_entry.get().strip()
+        
+        if not username or not password:
+            messagebox.showerror("Error", "Please enter both username and password!")
+            return
+        
+        try:
+            created = create_user(username, {"password": password})
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not created:
+            messagebox.showerror("Error", "Username already exists!")
+            return
+        
+        messagebox.showinfo("Success", "Registration successful! You can now login.")
+        
+    def show_main_menu(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#34495e")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text=f"Welcome, {self.current_user}!", 
+                font=("Arial", 18, "bold"), bg="#34495e", fg="white").pack(pady=15)
+        
+        # Menu buttons frame
+        buttons_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        buttons_frame.pack(expand=True)
+        
+        # Create menu buttons
+        buttons = [
+            ("📂 Organize Folder", self.show_organize_screen, "#3498db"),
+            ("⏪ Undo History", self.show_undo_screen, "#e67e22"),
+            ("🔎 Search Files", self.show_search_screen, "#2980b9"),
+            ("📋 Job Queue", self.show_queue_screen, "#34495e"),
+            ("♻️ Restore Backup", self.show_restore_screen, "#16a085"),
+            ("📜 View Log", self.show_log_screen, "#9b59b6"),
+            ("👋 Logout", self.logout, "#e74c3c")
+        ]
+        
+        for i, (text, command, color) in enumerate(buttons):
+            btn = tk.Button(buttons_frame, text=text, command=command,
+                          bg=color, fg="white", font=("Arial", 14, "bold"),
+                          width=25, pady=10, cursor="hand2")
+            btn.pack(pady=8)
+    
+    def show_organize_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#3498db")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="📂 Organize Folder", 
+                font=("Arial", 18, "bold"), bg="#3498db", fg="white").pack(pady=15)
+        
+        # Form frame
+        form_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        form_frame.pack(fill="both", expand=True, padx=50, pady=20)
+        
+        # Folder selection
+        tk.Label(form_frame, text="Select Folder to Organize:", font=("Arial", 12, "bold"), 
+                bg="#ffffff").pack(pady=(20, 10))
+        
+        folder_frame = tk.Frame(form_frame, bg="#ffffff")
+        folder_frame.pack(fill="x", padx=20, pady=10)
+        
+        self.folder_path_var = tk.StringVar()
+        self.folder_entry = tk.Entry(folder_frame, textvariable=self.folder_path_var, 
+                                   font=("Arial", 11), state="readonly")
+        self.folder_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        browse_btn = tk.Button(folder_frame, text="Browse", command=self.browse_folder,
+                             bg="#2ecc71", fg="white", font=("Arial", 10), cursor="hand2")
+        browse_btn.pack(side="right")
+        
+        # Skip extensions
+        tk.Label(form_frame, text="File Extensions to Skip (optional):", 
+                font=("Arial", 12, "bold"), bg="#ffffff").pack(pady=(20, 10))
+        
+        tk.Label(form_frame, text="Enter comma-separated extensions (e.g., .txt,.jpg)", 
+                font=("Arial", 10), bg="#ffffff", fg="#7f8c8d").pack(pady=(0, 5))
+        
+        self.skip_entry = tk.Entry(form_frame, font=("Arial", 11), width=40)
+        self.skip_entry.pack(pady=10)
+        
+        # Recursive mode
+        recursive_frame = tk.Frame(form_frame, bg="#ffffff")
+        recursive_frame.pack(pady=(10, 5))
+        
+        self.recursive_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(recursive_frame, text="Include subfolders", variable=self.recursive_var,
+                      font=("Arial", 10), bg="#ffffff").pack(side="left", padx=(0, 10))
+        
+        tk.Label(recursive_frame, text="Max depth (blank = unlimited):", font=("Arial", 10),
+                bg="#ffffff").pack(side="left")
+        self.depth_entry = tk.Entry(recursive_frame, font=("Arial", 11), width=5)
+        self.depth_entry.pack(side="left", padx=(5, 0))
+        
+        tk.Label(form_frame, text="Exclude patterns (comma-separated, e.g., .git,node_modules,*.tmp)", 
+                font=("Arial", 10), bg="#ffffff", fg="#7f8c8d").pack(pady=(5, 5))
+        
+        self.exclude_entry = tk.Entry(form_frame, font=("Arial", 11), width=40)
+        self.exclude_entry.pack(pady=(0, 10))
+        
+        self.sniff_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(form_frame, text="Detect the type of files without a known extension",
+                      variable=self.sniff_var, font=("Arial", 10), bg="#ffffff").pack(pady=(0, 5))
+        
+        dedup_frame = tk.Frame(form_frame, bg="#ffffff")
+        dedup_frame.pack(pady=(0, 5))
+        tk.Label(dedup_frame, text="Duplicate files:", font=("Arial", 10), bg="#ffffff").pack(side="left")
+        self.dedup_var = tk.StringVar(value=DEDUP_CHOICES[0][0])
+        ttk.Combobox(dedup_frame, textvariable=self.dedup_var, values=[label for label, _ in DEDUP_CHOICES],
+                     state="readonly", width=30).pack(side="left", padx=(5, 0))
+        
+        # Progress bar
+        self.progress_var = tk.StringVar(value="Ready to organize...")
+        tk.Label(form_frame, textvariable=self.progress_var, font=("Arial", 10), 
+                bg="#ffffff", fg="#7f8c8d").pack(pady=(20, 10))
+        
+        self.progress_bar = ttk.Progressbar(form_frame, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill="x", padx=20, pady=10)
+        
+        # Buttons
+        buttons_frame = tk.Frame(form_frame, bg="#ffffff")
+        buttons_frame.pack(pady=20)
+        
+        organize_btn = tk.Button(buttons_frame, text="🚀 Start Organization", 
+                               command=self.start_organization,
+                               bg="#e67e22", fg="white", font=("Arial", 12, "bold"),
+                               padx=20, pady=10, cursor="hand2")
+        organize_btn.pack(side="left", padx=10)
+        
+        preview_btn = tk.Button(buttons_frame, text="🔍 Preview", 
+                              command=self.start_preview,
+                              bg="#3498db", fg="white", font=("Arial", 12, "bold"),
+                              padx=20, pady=10, cursor="hand2")
+        preview_btn.pack(side="left", padx=10)
+        
+        load_plan_btn = tk.Button(buttons_frame, text="📄 Open Plan", 
+                                command=self.open_saved_plan,
+                                bg="#16a085", fg="white", font=("Arial", 12, "bold"),
+                                padx=20, pady=10, cursor="hand2")
+        load_plan_btn.pack(side="left", padx=10)
+        
+        self.watch_btn = tk.Button(buttons_frame, text="👁 Start Watching", 
+                                 command=self.toggle_watch,
+                                 bg="#8e44ad", fg="white", font=("Arial", 12, "bold"),
+                                 padx=20, pady=10, cursor="hand2")
+        self.watch_btn.pack(side="left", padx=10)
+        if self.watcher is not None:
+            self.watch_btn.config(text="⏹ Stop Watching")
+            self.progress_var.set("Watching for new files...")
+        
+        back_btn = tk.Button(buttons_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack(side="left", padx=10)
+    
+    def browse_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            self.folder_path_var.set(folder)
+    
+    def start_organization(self):
+        folder_path = self.folder_path_var.get()
+        if not folder_path:
+            messagebox.showerror("Error", "Please select a folder!")
+            return
+        
+        if not os.path.exists(folder_path):
+            messagebox.showerror("Error", "Folder path does not exist!")
+            return
+        
+        options = self.read_organize_options()
+        if options is None:
+            return
+        # Queue it; the job waits if another job is busy with the same folder
+        skip_exts, exclude, max_depth, recursive, sniff, dedup = options
+        metrics = RunMetrics()
+        job = submit_organize(self.scheduler, self.current_user, folder_path, self.organize_done, metrics,
+                              skip_exts=skip_exts, recursive=recursive, max_depth=max_depth,
+                              exclude=exclude, sniff=sniff, dedup=dedup)
+        self.progress_var.set(f"Queued as job {job.id}...")
+        self.track_progress(metrics)
+    
+    def read_organize_options(self):
+        # None (after telling the user) if a field can't be used
+        skip_text = self.skip_entry.get().strip()
+        skip_exts = [s.strip().lower() for s in skip_text.split(",")] if skip_text else []
+        exclude_text = self.exclude_entry.get().strip()
+        exclude = [s.strip() for s in exclude_text.split(",") if s.strip()] if exclude_text else []
+        depth_text = self.depth_entry.get().strip()
+        max_depth = int(depth_text) if depth_text.isdecimal() else None
+        if depth_text and max_depth is None:
+            messagebox.showerror("Error", "Max depth must be a whole number, 0 or more!")
+            return None
+        dedup = dict(DEDUP_CHOICES)[self.dedup_var.get()]
+        return skip_exts, exclude, max_depth, self.recursive_var.get(), self.sniff_var.get(), dedup
+    
+    def organize_done(self, job):
+        # Runs on the scheduler's worker thread, or the Tk thread when cancelled
+        job.progress.close()
+        if job.state == "cancelled":
+            self.root.after(0, lambda: self.set_watch_status(f"Job {job.id} was cancelled."))
+            return
+        if job.error is not None:
+            self.root.after(0, lambda: messagebox.showerror("Error", f"Organization failed: {str(job.error)}"))
+            return
+        if len(job.result) == 3:
+            summary, skipped, backup_path = job.result
+            if skipped:
+                summary["Skipped (changed since planning)"] = skipped
+        else:
+            summary, backup_path = job.result
+        self.root.after(0, lambda: self.show_organization_results(summary, backup_path))
+    
+    def track_progress(self, metrics):
+        # Redraw from a snapshot at a fixed rate, however many files moved in between
+        if metrics.finished:
+            return
+        try:
+            percent, text = format_progress(metrics.snapshot(), PHASE_LABELS)
+            if text:
+                self.progress_var.set(f"{text} · {governor.format_rate(governor.current().snapshot())}")
+            self.progress_bar["value"] = percent or 0
+        except tk.TclError:
+            # Organize screen was closed, the run carries on without it
+            return
+        self.root.after(PROGRESS_INTERVAL_MS, lambda: self.track_progress(metrics))
+    
+    def start_preview(self):
+        folder_path = self.folder_path_var.get()
+        if not folder_path or not os.path.isdir(folder_path):
+            messagebox.showerror("Error", "Please select a folder!")
+            return
+        
+        options = self.read_organize_options()
+        if options is None:
+            return
+        skip_exts, exclude, max_depth, recursive, sniff, dedup = options
+        self.progress_var.set("Planning...")
+        metrics = RunMetrics()
+        self.track_progress(metrics)
+        
+        def plan_thread():
+            try:
+                plan = plan_folder(self.current_user, folder_path, skip_exts, recursive, max_depth, exclude, sniff,
+                                   metrics=metrics, dedup=dedup)
+                self.root.after(0, lambda: self.show_plan_preview(plan))
+            except Exception as e:
+                message = f"Planning failed: {str(e)}"
+                self.root.after(0, lambda: messagebox.showerror("Error", message))
+            finally:
+                metrics.close()
+        
+        thread = threading.Thread(target=plan_thread)
+        thread.daemon = True
+        thread.start()
+    
+    def open_saved_plan(self):
+        path = filedialog.askopenfilename(filetypes=[("Move plans", "*.plan *.plan.gz"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            plan = MovePlan.load(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Cannot open plan: {str(e)}")
+            return
+        self.show_plan_preview(plan)
+    
+    def show_plan_preview(self, plan):
+        self.progress_var.set(f"Planned {len(plan)} move(s).")
+        
+        window = tk.Toplevel(self.root)
+        window.title("Organization Preview")
+        window.geometry("700x500")
+        
+        preview = scrolledtext.ScrolledText(window, wrap=tk.NONE, font=("Courier", 10),
+                                            bg="#f8f9fa", fg="#2c3e50")
+        preview.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        lines = [f"Folder: {plan.folder_path}", f"{len(plan)} file(s), {plan.total_bytes() / 1048576:.1f} MB"]
+        if plan.duplicates:
+            lines.append(f"{plan.duplicates} duplicate file(s) found"
+                         + (f", {len(plan.links)} to be hardlinked" if plan.links else ""))
+        lines.append("")
+        for category, (count, size) in sorted(plan.summary().items()):
+            lines.append(f"• {category}: {count} file(s), {size / 1048576:.1f} MB")
+        lines.append("")
+        # Listing every row of a huge plan would freeze the widget
+        for i in range(min(len(plan), PREVIEW_ROWS)):
+            src, dest, _, _, _, _ = plan.row(i)
+            lines.append(f"{os.path.relpath(src, plan.folder_path)} → {os.path.relpath(dest, plan.folder_path)}")
+        if len(plan) > PREVIEW_ROWS:
+            lines.append(f"... and {len(plan) - PREVIEW_ROWS} more")
+        preview.insert("1.0", "\n".join(lines))
+        preview.config(state="disabled")
+        
+        buttons_frame = tk.Frame(window)
+        buttons_frame.pack(pady=10)
+        
+        def execute():
+            window.destroy()
+            self.start_plan_execution(plan)
+        
+        def save():
+            path = filedialog.asksaveasfilename(defaultextension=".plan.gz",
+                                                filetypes=[("Move plans", "*.plan *.plan.gz")])
+            if path:
+                plan.save(path)
+        
+        def compare():
+            path = filedialog.askopenfilename(filetypes=[("Move plans", "*.plan *.plan.gz"), ("All files", "*")])
+            if path:
+                diff = diff_plans(MovePlan.load(path), plan)
+                messagebox.showinfo("Plan Comparison", f"New moves: {len(diff['added'])}\n"
+                                    f"No longer planned: {len(diff['removed'])}\n"
+                                    f"Different destination: {len(diff['changed'])}", parent=window)
+        
+        tk.Button(buttons_frame, text="🚀 Execute", command=execute, bg="#e67e22", fg="white",
+                 font=("Arial", 11, "bold"), padx=15, cursor="hand2").pack(side="left", padx=5)
+        tk.Button(buttons_frame, text="💾 Save Plan", command=save, bg="#2ecc71", fg="white",
+                 font=("Arial", 11, "bold"), padx=15, cursor="hand2").pack(side="left", padx=5)
+        tk.Button(buttons_frame, text="⚖️ Compare", command=compare, bg="#3498db", fg="white",
+                 font=("Arial", 11, "bold"), padx=15, cursor="hand2").pack(side="left", padx=5)
+        tk.Button(buttons_frame, text="Close", command=window.destroy, bg="#7f8c8d", fg="white",
+                 font=("Arial", 11, "bold"), padx=15, cursor="hand2").pack(side="left", padx=5)
+    
+    def start_plan_execution(self, plan):
+        metrics = RunMetrics()
+        job = submit_plan(self.scheduler, self.current_user, plan, self.organize_done, metrics)
+        self.progress_var.set(f"Queued as job {job.id}...")
+        self.track_progress(metrics)
+    
+    def toggle_watch(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            return
+        
+        folder_path = self.folder_path_var.get()
+        if not folder_path or not os.path.isdir(folder_path):
+            messagebox.showerror("Error", "Please select a folder!")
+            return
+        options = self.read_organize_options()
+        if options is None:
+            return
+        skip_exts, exclude, _, _, sniff, _ = options
+        
+        # Watching occupies the folder like a job would, until stopped
+        self.watch_hold = self.scheduler.hold([folder_path])
+        if self.watch_hold is None:
+            messagebox.showerror("Error", "Another job is working in this folder, try again when it is done.")
+            return
+        try:
+            self.watcher = FolderWatcher(os.path.abspath(folder_path), settle=WATCH_SETTLE)
+        except (RuntimeError, OSError) as e:
+            self.watch_hold.release()
+            messagebox.showerror("Error", f"Cannot watch folder: {str(e)}")
+            return
+        
+        self.watch_btn.config(text="⏹ Stop Watching")
+        self.progress_var.set("Watching for new files...")
+        
+        thread = threading.Thread(target=self.watch_thread, args=(folder_path, skip_exts, exclude, sniff))
+        thread.daemon = True
+        thread.start()
+    
+    def watch_thread(self, folder_path, skip_exts, exclude, sniff):
+        total = [0]
+        
+        def on_batch(count, summary):
+            total[0] += count
+            self.root.after(0, lambda: self.set_watch_status(f"Watching... {total[0]} file(s) organized so far"))
+        
+        try:
+            watch_folder(self.current_user, folder_path, skip_exts, exclude, sniff,
+                         on_batch=on_batch, watcher=self.watcher)
+            message = f"Stopped watching. {total[0]} file(s) organized."
+        except Exception as e:
+            message = f"Watching failed: {str(e)}"
+        self.watch_hold.release()
+        self.watcher = None
+        self.root.after(0, lambda: self.stop_watch_ui(message))
+    
+    def set_watch_status(self, text):
+        # The organize screen may have been closed while watching
+        try:
+            self.progress_var.set(text)
+        except tk.TclError:
+            pass
+    
+    def stop_watch_ui(self, message):
+        try:
+            self.watch_btn.config(text="👁 Start Watching")
+            self.progress_var.set(message)
+        except tk.TclError:
+            pass
+    
+    def show_organization_results(self, summary, backup_path):
+        self.progress_bar["value"] = 100
+        self.progress_var.set("Organization complete!")
+        
+        if summary:
+            result_text = "Organization Summary:\n\n"
+            for category, count in summary.items():
+                result_text += f"• {category}: {count} file(s)\n"
+            result_text += f"\nBackup created at:\n{backup_path}"
+            messagebox.showinfo("Success", result_text)
+        else:
+            messagebox.showinfo("Info", "No files were organized.")
+    
+    def show_undo_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#e67e22")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="⏪ Undo History", 
+                font=("Arial", 18, "bold"), bg="#e67e22", fg="white").pack(pady=15)
+        
+        # Run list, newest first
+        list_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        self.run_list = tk.Listbox(list_frame, font=("Courier", 10), bg="#f8f9fa", fg="#2c3e50")
+        self.run_list.pack(fill="both", expand=True, padx=20, pady=20)
+        self.undo_runs = list(reversed(list_runs(self.current_user)))
+        for run in self.undo_runs:
+            self.run_list.insert(tk.END, f"{run['run']}  {run['state']:<11} {run['files']:>7} file(s)  {run['folder']}")
+        if self.undo_runs:
+            self.run_list.selection_set(0)
+        
+        # Buttons
+        buttons_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        buttons_frame.pack()
+        
+        undo_btn = tk.Button(buttons_frame, text="⏪ Undo Selected", command=self.undo_operation,
+                           bg="#e67e22", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        undo_btn.pack(side="left", padx=10)
+        
+        back_btn = tk.Button(buttons_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack(side="left", padx=10)
+    
+    def undo_operation(self):
+        selection = self.run_list.curselection()
+        if not selection:
+            messagebox.showerror("Error", "No undo history found!")
+            return
+        
+        run = self.undo_runs[selection[0]]
+        if run["state"] == "undone":
+            messagebox.showerror("Error", "This operation has already been undone!")
+            return
+
+        if messagebox.askyesno("Confirm", f"Are you sure you want to undo run {run['run']}?"):
+            try:
+                job = submit_undo(self.scheduler, self.current_user, run["run"], self.undo_done)
+            except Exception as e:
+                messagebox.showerror("Error", f"Undo failed: {str(e)}")
+                return
+            messagebox.showinfo("Queued", f"Undo queued as job {job.id}. Progress is shown in the Job Queue.")
+    
+    def undo_done(self, job):
+        if job.state == "cancelled":
+            return
+        if job.error is not None:
+            self.root.after(0, lambda: messagebox.showerror("Error", f"Undo failed: {str(job.error)}"))
+        else:
+            self.root.after(0, lambda: messagebox.showinfo("Success", f"Undo complete! Restored {job.result} files."))
+    
+    def show_search_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#2980b9")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="🔎 Search Files", 
+                font=("Arial", 18, "bold"), bg="#2980b9", fg="white").pack(pady=15)
+        
+        # Query fields
+        form_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        form_frame.pack(fill="x", padx=20, pady=(0, 10))
+        
+        self.search_entries = {}
+        for column, (label, width) in enumerate([("Name contains", 20), ("Extension", 8),
+                                                 ("From (YYYY-MM-DD)", 12), ("To (YYYY-MM-DD)", 12)]):
+            tk.Label(form_frame, text=label, font=("Arial", 10), bg="#ffffff").grid(row=0, column=column, padx=5, pady=(10, 0))
+            entry = tk.Entry(form_frame, font=("Arial", 11), width=width)
+            entry.grid(row=1, column=column, padx=5, pady=(0, 10))
+            self.search_entries[label] = entry
+        
+        search_btn = tk.Button(form_frame, text="Search", command=self.run_search,
+                             bg="#2980b9", fg="white", font=("Arial", 10, "bold"), cursor="hand2")
+        search_btn.grid(row=1, column=4, padx=10, pady=(0, 10))
+        self.root.bind('<Return>', lambda e: self.run_search())
+        
+        # Results
+        results_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        results_frame.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+        
+        columns = ("name", "category", "size", "modified", "path")
+        self.search_tree = ttk.Treeview(results_frame, columns=columns, show="headings")
+        for column, width in zip(columns, (160, 90, 70, 130, 300)):
+            self.search_tree.heading(column, text=column.title())
+            self.search_tree.column(column, width=width, anchor="w")
+        self.search_tree.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        self.search_status = tk.StringVar(value="Searches the index of organized files.")
+        tk.Label(main_frame, textvariable=self.search_status, font=("Arial", 10), 
+                bg="#f0f0f0", fg="#7f8c8d").pack()
+        
+        back_btn = tk.Button(main_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack(pady=(10, 0))
+    
+    def run_search(self):
+        values = {label: entry.get().strip() for label, entry in self.search_entries.items()}
+        try:
+            since = time.mktime(time.strptime(values["From (YYYY-MM-DD)"], "%Y-%m-%d")) if values["From (YYYY-MM-DD)"] else None
+            # "To" is inclusive of the whole day
+            until = time.mktime(time.strptime(values["To (YYYY-MM-DD)"], "%Y-%m-%d")) + 86400 if values["To (YYYY-MM-DD)"] else None
+        except ValueError:
+            messagebox.showerror("Error", "Dates must look like 2024-05-31!")
+            return
+        
+        started = time.perf_counter()
+        with open_index() as index:
+            rows = index.search(self.current_user, name=values["Name contains"] or None,
+                                ext=values["Extension"] or None, since=since, until=until, limit=SEARCH_LIMIT)
+        elapsed = (time.perf_counter() - started) * 1000
+        
+        self.search_tree.delete(*self.search_tree.get_children())
+        for path, category, size, mtime_ns in rows:
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime_ns / 1e9))
+            self.search_tree.insert("", tk.END, values=(os.path.basename(path), category,
+                                                        f"{size / 1024:.0f} KB", modified, path))
+        more = " (limit reached)" if len(rows) == SEARCH_LIMIT else ""
+        self.search_status.set(f"{len(rows)} result(s){more} in {elapsed:.1f} ms")
+    
+    def show_restore_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#16a085")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="♻️ Restore Backup", 
+                font=("Arial", 18, "bold"), bg="#16a085", fg="white").pack(pady=15)
+        
+        # Snapshot list
+        list_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        self.snapshot_list = tk.Listbox(list_frame, font=("Courier", 11), bg="#f8f9fa", fg="#2c3e50")
+        self.snapshot_list.pack(fill="both", expand=True, padx=20, pady=20)
+        for snapshot_id in reversed(list_backups(self.current_user)):
+            self.snapshot_list.insert(tk.END, snapshot_id)
+        
+        # Buttons
+        buttons_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        buttons_frame.pack()
+        
+        restore_btn = tk.Button(buttons_frame, text="♻️ Restore Selected", command=self.restore_selected,
+                              bg="#16a085", fg="white", font=("Arial", 12, "bold"),
+                              padx=20, pady=10, cursor="hand2")
+        restore_btn.pack(side="left", padx=10)
+        
+        back_btn = tk.Button(buttons_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack(side="left", padx=10)
+    
+    def restore_selected(self):
+        selection = self.snapshot_list.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a backup!")
+            return
+        
+        snapshot_id = self.snapshot_list.get(selection[0])
+        if not messagebox.askyesno("Confirm", f"Restore every file from backup {snapshot_id}?"):
+            return
+        
+        def restore_thread():
+            try:
+                restored = restore_backup(self.current_user, snapshot_id)
+                self.root.after(0, lambda: messagebox.showinfo("Success", f"Restore complete! Restored {restored} files."))
+            except Exception as e:
+                message = f"Restore failed: {str(e)}"
+                self.root.after(0, lambda: messagebox.showerror("Error", message))
+        
+        thread = threading.Thread(target=restore_thread)
+        thread.daemon = True
+        thread.start()
+    
+    def show_log_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#9b59b6")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="📜 Activity Log", 
+                font=("Arial", 18, "bold"), bg="#9b59b6", fg="white").pack(pady=15)
+        
+        # Search and follow controls
+        tools_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        tools_frame.pack(fill="x", padx=20, pady=(0, 5))
+        
+        tk.Label(tools_frame, text="Find:", font=("Arial", 10), bg="#f0f0f0").pack(side="left")
+        self.log_search_entry = tk.Entry(tools_frame, font=("Arial", 11), width=30)
+        self.log_search_entry.pack(side="left", padx=5)
+        self.log_search_entry.bind("<KeyRelease>", self.log_search_typed)
+        self.log_search_entry.bind("<Return>", lambda e: self.find_in_log(forward=True))
+        self.log_search_entry.bind("<Shift-Return>", lambda e: self.find_in_log(forward=False))
+        tk.Button(tools_frame, text="▲", command=lambda: self.find_in_log(forward=False),
+                 cursor="hand2").pack(side="left")
+        tk.Button(tools_frame, text="▼", command=lambda: self.find_in_log(forward=True),
+                 cursor="hand2").pack(side="left", padx=(2, 10))
+        self.log_follow_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(tools_frame, text="Follow new entries", variable=self.log_follow_var,
+                      bg="#f0f0f0", command=self.render_log).pack(side="left")
+        self.log_status = tk.StringVar()
+        tk.Label(tools_frame, textvariable=self.log_status, font=("Arial", 10),
+                bg="#f0f0f0", fg="#7f8c8d").pack(side="right")
+        
+        # Log display frame: the text widget only ever holds the visible lines
+        log_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        log_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        self.log_scrollbar = ttk.Scrollbar(log_frame, orient="vertical", command=self.scroll_log)
+        self.log_scrollbar.pack(side="right", fill="y")
+        x_scrollbar = ttk.Scrollbar(log_frame, orient="horizontal")
+        x_scrollbar.pack(side="bottom", fill="x")
+        self.log_text = tk.Text(log_frame, wrap=tk.NONE, font=("Courier", 10),
+                                bg="#f8f9fa", fg="#2c3e50", xscrollcommand=x_scrollbar.set)
+        self.log_text.pack(fill="both", expand=True, padx=(20, 0), pady=20)
+        x_scrollbar.config(command=self.log_text.xview)
+        self.log_text.tag_configure("match", background="#f9e79f")
+        self.log_text.bind("<Configure>", lambda e: self.render_log())
+        self.log_text.bind("<MouseWheel>", lambda e: self.scroll_log("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.log_text.bind("<Button-4>", lambda e: self.scroll_log("scroll", -1, "units"))
+        self.log_text.bind("<Button-5>", lambda e: self.scroll_log("scroll", 1, "units"))
+        for key, args in (("<Prior>", (-1, "pages")), ("<Next>", (1, "pages")),
+                          ("<Up>", (-1, "units")), ("<Down>", (1, "units"))):
+            self.log_text.bind(key, lambda e, args=args: self.scroll_log("scroll", *args) or "break")
+        
+        # Load and display log
+        self.log_index = LogIndex(os.path.join(DATA_DIR, "logs", f"{self.current_user}_log.txt"))
+        self.log_top = 0
+        self.log_match = None
+        self.log_index.refresh()
+        self.render_log()
+        self.poll_log(self.log_text, self.log_index)
+        
+        # Back button
+        back_btn = tk.Button(main_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack()
+    
+    def log_page_size(self):
+        line_height = tkfont.Font(font=self.log_text["font"]).metrics("linespace")
+        return max(1, self.log_text.winfo_height() // line_height)
+    
+    def render_log(self):
+        page = self.log_page_size()
+        total = len(self.log_index)
+        if self.log_follow_var.get():
+            self.log_top = max(0, total - page)
+        self.log_top = max(0, min(self.log_top, total - page))
+        
+        self.log_text.config(state="normal")
+        self.log_text.delete("1.0", tk.END)
+        if total:
+            self.log_text.insert("1.0", "\n".join(self.log_index.lines(self.log_top, page)))
+            self.log_status.set(f"Lines {self.log_top + 1}-{min(total, self.log_top + page)} of {total}")
+        else:
+            self.log_text.insert("1.0", "No activity log found. Start organizing files to see activity here!")
+            self.log_status.set("")
+        if self.log_match is not None and self.log_top <= self.log_match < self.log_top + page:
+            row = self.log_match - self.log_top + 1
+            self.log_text.tag_add("match", f"{row}.0", f"{row}.end")
+        self.log_text.config(state="disabled")
+        if total:
+            self.log_scrollbar.set(self.log_top / total, min(1.0, (self.log_top + page) / total))
+        else:
+            self.log_scrollbar.set(0, 1)
+    
+    def scroll_log(self, action, amount, unit=None):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        total = len(self.log_index)
+        if action == "moveto":
+            self.log_top = int(float(amount) * total)
+        else:
+            step = self.log_page_size() if unit == "pages" else 1
+            self.log_top += int(amount) * step
+        # Scrolling away from the end stops following, scrolling back to it resumes
+        self.log_follow_var.set(self.log_top + self.log_page_size() >= total)
+        self.render_log()
+    
+    def poll_log(self, widget, index):
+        # Picks up new entries while a run is writing; one stat per tick when idle
+        if not widget.winfo_exists():
+            index.close()
+            return
+        if index.refresh():
+            self.render_log()
+        self.root.after(PROGRESS_INTERVAL_MS * 2, lambda: self.poll_log(widget, index))
+    
+    def log_search_typed(self, event):
+        if event.keysym in ("Return", "Shift_L", "Shift_R", "Up", "Down"):
+            return
+        # Incremental: search again from the current match as the term grows
+        self.find_in_log(forward=True, start=self.log_match if self.log_match is not None else self.log_top)
+    
+    def find_in_log(self, forward=True, start=None):
+        term = self.log_search_entry.get()
+        if not term:
+            self.log_match = None
+            self.render_log()
+            return
+        if start is None:
+            current = self.log_match if self.log_match is not None else self.log_top
+            start = current + 1 if forward else current - 1
+        found = self.log_index.search(term, max(0, start), backwards=not forward)
+        if found is None:
+            self.log_status.set(f"No {'later' if forward else 'earlier'} match for \"{term}\"")
+            return
+        self.log_match = found
+        self.log_follow_var.set(False)
+        page = self.log_page_size()
+        if not self.log_top <= found < self.log_top + page:
+            self.log_top = max(0, found - page // 2)
+        self.render_log()
+    
+    def show_queue_screen(self):
+        self.clear_window()
+        
+        # Main frame
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+        
+        # Header
+        header_frame = tk.Frame(main_frame, bg="#34495e")
+        header_frame.pack(fill="x", pady=(0, 20))
+        
+        tk.Label(header_frame, text="📋 Job Queue", 
+                font=("Arial", 18, "bold"), bg="#34495e", fg="white").pack(pady=15)
+        
+        # Every job in this session, all users
+        list_frame = tk.Frame(main_frame, bg="#ffffff", relief="raised", bd=2)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        columns = ("id", "user", "kind", "state", "progress", "folder")
+        self.queue_tree = ttk.Treeview(list_frame, columns=columns, show="headings")
+        for column, width in zip(columns, (40, 80, 70, 80, 260, 200)):
+            self.queue_tree.heading(column, text=column.title())
+            self.queue_tree.column(column, width=width, anchor="w")
+        self.queue_tree.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        # Effective rate across every job, after the I/O limits
+        self.io_rate_var = tk.StringVar()
+        tk.Label(main_frame, textvariable=self.io_rate_var, font=("Arial", 10),
+                bg="#f0f0f0", fg="#7f8c8d").pack(pady=(0, 10))
+        
+        buttons_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        buttons_frame.pack()
+        
+        cancel_btn = tk.Button(buttons_frame, text="✖ Cancel Selected", command=self.cancel_selected_job,
+                             bg="#e74c3c", fg="white", font=("Arial", 12, "bold"),
+                             padx=20, pady=10, cursor="hand2")
+        cancel_btn.pack(side="left", padx=10)
+        
+        back_btn = tk.Button(buttons_frame, text="← Back", command=self.show_main_menu,
+                           bg="#7f8c8d", fg="white", font=("Arial", 12, "bold"),
+                           padx=20, pady=10, cursor="hand2")
+        back_btn.pack(side="left", padx=10)
+        
+        self.refresh_queue(self.queue_tree)
+    
+    def refresh_queue(self, tree):
+        # Polled like the progress bar; stops once this screen is gone
+        if not tree.winfo_exists():
+            return
+        selected = tree.selection()
+        tree.delete(*tree.get_children())
+        for job in reversed(self.scheduler.jobs()):
+            state = job.state
+            if state == "queued" and job.waiting:
+                state = "waiting"
+            progress = ""
+            if job.error is not None:
+                progress = str(job.error)
+            elif job.progress is not None and state == "running":
+                progress = format_progress(job.progress.snapshot(), PHASE_LABELS)[1]
+            tree.insert("", tk.END, iid=str(job.id),
+                        values=(job.id, job.user, job.kind, state, progress, ", ".join(job.folders)))
+        tree.selection_set([iid for iid in selected if tree.exists(iid)])
+        self.io_rate_var.set(governor.format_rate(governor.current().snapshot()))
+        self.root.after(PROGRESS_INTERVAL_MS * 4, lambda: self.refresh_queue(tree))
+    
+    def cancel_selected_job(self):
+        selection = self.queue_tree.selection()
+        if not selection:
+            return
+        if not self.scheduler.cancel(int(selection[0])):
+            messagebox.showerror("Error", "Only jobs that haven't started can be cancelled.")
+    
+    def logout(self):
+        if messagebox.askyesno("Confirm", "Are you sure you want to logout?"):
+            if self.watcher is not None:
+                self.watcher.stop()
+            self.current_user = None
+            self.show_login_screen()
+    
+    def run(self):
+        self.root.mainloop()
+
+if __name__ == "__main__":
+    FileOrganizerGUI().run()
@@ -0,0 +1,159 @@
+import os
+import json
+from array import array
+
+# A move plan keeps one row per file in parallel typed arrays. Directory and
+# category strings are interned into small tables, file names are packed
+# into one bytes buffer, so a million rows stay in the tens of MB.
+PLAN_VERSION = 1
+
+class MovePlan:
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.dirs = []
+        self.dir_index = {}
+        self.categories = []
+        self.category_index = {}
+
+        self.src_dir = array("I")
+        self.dest_dir = array("I")
+        self.category = array("H")
+        self.size = array("Q")
+        self.mtime_ns = array("q")
+        self.ino = array("Q")
+        self.names = bytearray()
+        self.name_end = array("Q")
+        # Only rows whose destination name differs (collision suffix) are stored
+        self.renamed = {}
+        # Rows to be replaced by a hardlink to another source before moving, see dedup
+        self.links = {}
+        # Link targets outside the plan (organized by an earlier run): path -> (size, mtime_ns, ino)
+        self.kept = {}
+        # Redundant copies found while planning, whatever was done with them
+        self.duplicates = 0
+
+    def intern_dir(self, path):
+        index = self.dir_index.get(path)
+        if index is None:
+            index = self.dir_index[path] = len(self.dirs)
+            self.dirs.append(path)
+        return index
+
+    def intern_category(self, category):
+        index = self.category_index.get(category)
+        if index is None:
+            index = self.category_index[category] = len(self.categories)
+            self.categories.append(category)
+        return index
+
+    def add(self, src_path, dest_path, category, size, mtime_ns, ino, link_to=None):
+        src_dir, name = os.path.split(src_path)
+        dest_dir, dest_name = os.path.split(dest_path)
+        if dest_name != name:
+            self.renamed[len(self.src_dir)] = dest_name
+        if link_to is not None:
+            self.links[len(self.src_dir)] = link_to
+        self.src_dir.append(self.intern_dir(src_dir))
+        self.dest_dir.append(self.intern_dir(dest_dir))
+        self.category.append(self.intern_category(category))
+        self.size.append(size)
+        self.mtime_ns.append(mtime_ns)
+        self.ino.append(ino)
+        self.names += os.fsencode(name)
+        self.name_end.append(len(self.names))
+
+    def __len__(self):
+        return len(self.src_dir)
+
+    def name(self, i):
+        start = self.name_end[i - 1] if i else 0
+        return os.fsdecode(bytes(self.names[start:self.name_end[i]]))
+
+    def source(self, i):
+        return os.path.join(self.dirs[self.src_dir[i]], self.name(i))
+
+    def row(self, i):
+        name = self.name(i)
+        return (os.path.join(self.dirs[self.src_dir[i]], name),
+                os.path.join(self.dirs[self.dest_dir[i]], self.renamed.get(i, name)),
+                self.categories[self.category[i]],
+                self.size[i], self.mtime_ns[i], self.ino[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def source_order(self):
+        # Row indices sorted by source. Plans are built from sorted scans, so
+        # this is normally one pass to check, not a sort of every row
+        previous = None
+        for i in range(len(self)):
+            src = self.source(i)
+            if previous is not None and src < previous:
+                return sorted(range(len(self)), key=self.source)
+            previous = src
+        return range(len(self))
+
+    def summary(self):
+        counts = {}
+        for category_index, size in zip(self.category, self.size):
+            entry = counts.setdefault(self.categories[category_index], [0, 0])
+            entry[0] += 1
+            entry[1] += size
+        return counts
+
+    def total_bytes(self):
+        return sum(self.size)
+
+    def save(self, path):
+        # One JSON array per line, sorted by source: plain text that diffs well
+        import gzip  # only needed for .gz plans, keeps startup light
+        opener = gzip.open if path.endswith(".gz") else open
+        tmp = path + ".tmp"
+        with opener(tmp, "wt", encoding="utf-8") as f:
+            header = {"version": PLAN_VERSION, "folder": self.folder_path, "files": len(self),
+                      "duplicates": self.duplicates}
+            if self.kept:
+                header["kept"] = self.kept
+            f.write(json.dumps(header) + "\n")
+            # A row to be hardlinked carries the source it links to as a seventh field
+            for i in self.source_order():
+                row = self.row(i) + ((self.links[i],) if i in self.links else ())
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        import gzip
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != PLAN_VERSION:
+                raise ValueError(f"Unsupported plan version: {header.get('version')}")
+            plan = cls(header["folder"])
+            plan.duplicates = header.get("duplicates", 0)
+            plan.kept = {path: tuple(version) for path, version in header.get("kept", {}).items()}
+            for line in f:
+                plan.add(*json.loads(line))
+        return plan
+
+def diff_plans(old, new):
+    # Merge the two plans in source order, a row at a time from each side
+    added, removed, changed = [], [], []
+    old_rows = (old.row(i) for i in old.source_order())
+    new_rows = (new.row(i) for i in new.source_order())
+    old_row = next(old_rows, None)
+    new_row = next(new_rows, None)
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None and old_row[0] < new_row[0]):
+            removed.append(old_row)
+            old_row = next(old_rows, None)
+        elif old_row is None or new_row[0] < old_row[0]:
+            added.append(new_row)
+            new_row = next(new_rows, None)
+        else:
+            if old_row[1] != new_row[1]:
+                changed.append((old_row[0], old_row[1], new_row[1]))
+            old_row = next(old_rows, None)
+            new_row = next(new_rows, None)
+    return {"added": added, "removed": removed, "changed": changed}
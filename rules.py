@@ -0,0 +1,186 @@
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+
+# Classification rules, loaded from JSON:
+#
+#   {
+#     "categories": {"Design": [".psd", ".ai"], "Images": [".jpg", ".heic"]},
+#     "rules": [
+#       {"category": "Invoices", "glob": "invoice*.pdf"},
+#       {"category": "Screenshots", "regex": "^Screen ?Shot .*\\.png$"},
+#       {"category": "Installers", "ext": [".exe", ".dmg"], "min_size": 1048576},
+#       {"category": "Archive/Old", "older_than_days": 365}
+#     ]
+#   }
+#
+# "categories" extends/overrides the extension map. "rules" are tried in
+# order before the extension map; a rule may combine glob/regex/ext with
+# min_size, max_size, older_than_days and newer_than_days. Categories are
+# folders inside the organized one: absolute paths and ".." are refused.
+DAY = 24 * 60 * 60
+LEADING_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+def scoped_regex(regex):
+    # Global flags such as "(?i)" must open the whole pattern, which a rule's
+    # regex no longer does once combined; they become a group scoped to it
+    flags = ""
+    m = LEADING_FLAGS.match(regex)
+    while m:
+        flags += m.group(1)
+        regex = regex[m.end():]
+        m = LEADING_FLAGS.match(regex)
+    return f"(?{''.join(dict.fromkeys(flags))}:{regex})" if flags else f"(?:{regex})"
+
+def rule_pattern(rule):
+    parts = []
+    if "glob" in rule:
+        # fnmatch.translate gives "(?s:...)\Z", globs match case-insensitively
+        parts.append(f"(?i:{fnmatch.translate(rule['glob'])[:-2]})")
+    if "regex" in rule:
+        parts.append(scoped_regex(rule["regex"]))
+    if "ext" in rule:
+        exts = "|".join(re.escape(e.lower().lstrip(".")) for e in rule["ext"])
+        parts.append(f"(?i:.*\\.(?:{exts}))")
+    if not parts:
+        return "(?s:.*)"
+    # Every part must hold: lookaheads for all but the last
+    return "".join(f"(?={p}\\Z)" for p in parts[:-1]) + parts[-1]
+
+def check_category(category, where):
+    # A category is a folder under the organized one; an absolute path or ".."
+    # would let a rules file in that folder send files anywhere
+    parts = category.replace("\\", "/").split("/")
+    if not category or os.path.isabs(category) or os.path.splitdrive(category)[0] or ".." in parts:
+        raise ValueError(f"{where}: category must be a relative folder without '..', got {category!r}")
+
+def compile_rule(rule, index):
+    where = f"Rule {index + 1} ({rule.get('category', '?')})"
+    if "category" not in rule:
+        raise ValueError(f"{where}: no category")
+    check_category(rule["category"], where)
+    try:
+        return re.compile(rule_pattern(rule) + r"\Z")
+    except re.error as e:
+        raise ValueError(f"{where}: bad regex: {e}") from None
+
+class RuleSet:
+    def __init__(self, file_types, config=None, default="Others"):
+        config = config or {}
+        self.default = default
+
+        # Extension lookup is a single dict probe
+        self.ext_map = {}
+        for category, exts in file_types.items():
+            for ext in exts:
+                self.ext_map.setdefault(ext.lower(), category)
+        for category, exts in config.get("categories", {}).items():
+            check_category(category, "Categories")
+            for ext in exts:
+                self.ext_map[ext.lower()] = category
+
+        # All glob/regex/ext rules become one alternation; the named group that
+        # matched tells which rule fired, so per-file cost doesn't grow with rules.
+        # A regex with groups of its own would break the alternation (group
+        # names clash, backreferences shift), those rules are matched one by one.
+        self.rules = list(config.get("rules", []))
+        self.patterns = [compile_rule(rule, i) for i, rule in enumerate(self.rules)]
+        combined = [i for i, pattern in enumerate(self.patterns) if not pattern.groups]
+        self.separate = [i for i, pattern in enumerate(self.patterns) if pattern.groups]
+        if combined:
+            self.combined = re.compile("|".join(f"(?P<r{i}>{rule_pattern(self.rules[i])})" for i in combined))
+        else:
+            self.combined = None
+
+        self.folders = {self.default} | set(self.ext_map.values())
+        self.folders.update(rule["category"] for rule in self.rules)
+        # Only the top-level folder matters when skipping already organized trees
+        self.folders = {category.replace("\\", "/").split("/")[0] for category in self.folders}
+
+    def conditions_hold(self, rule, st, now):
+        if st is None:
+            return not any(k in rule for k in ("min_size", "max_size", "older_than_days", "newer_than_days"))
+        if "min_size" in rule and st.st_size < rule["min_size"]:
+            return False
+        if "max_size" in rule and st.st_size > rule["max_size"]:
+            return False
+        age = now - st.st_mtime
+        if "older_than_days" in rule and age < rule["older_than_days"] * DAY:
+            return False
+        if "newer_than_days" in rule and age > rule["newer_than_days"] * DAY:
+            return False
+        return True
+
+    def first_match(self, name):
+        # Index of the first rule whose pattern matches name, or None
+        first = None
+        if self.combined is not None:
+            m = self.combined.fullmatch(name)
+            if m is not None:
+                first = int(m.lastgroup[1:])
+        for i in self.separate:
+            if first is not None and i > first:
+                break
+            if self.patterns[i].match(name):
+                return i
+        return first
+
+    def match(self, name, st=None, now=None):
+        # now: reference time for the age conditions, one per batch keeps a
+        # batch consistent; a long-lived RuleSet (watch mode) must not fix it
+        if now is None:
+            now = time.time()
+        if self.rules:
+            first = self.first_match(name)
+            if first is not None:
+                if self.conditions_hold(self.rules[first], st, now):
+                    return self.rules[first]["category"], first
+                # Rare path: the first pattern hit failed on size/age, try the rest in order
+                for i in range(first + 1, len(self.rules)):
+                    if self.patterns[i].match(name) and self.conditions_hold(self.rules[i], st, now):
+                        return self.rules[i]["category"], i
+        category = self.ext_map.get(os.path.splitext(name)[1].lower())
+        if category is not None:
+            return category, "ext"
+        return self.default, "default"
+
+    def classify(self, name, st=None, now=None):
+        return self.match(name, st, now)[0]
+
+def load_config(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def merge_configs(configs):
+    merged = {"categories": {}, "rules": []}
+    # Later configs win: their rules go first, their extension mappings override
+    for config in configs:
+        merged["categories"].update(config.get("categories", {}))
+        merged["rules"] = list(config.get("rules", [])) + merged["rules"]
+    return merged
+
+def test_rules(ruleset, paths):
+    # Classify a listing without touching anything; stat only what exists
+    results = []
+    now = time.time()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        category, rule = ruleset.match(os.path.basename(path), st, now)
+        results.append((path, category, rule))
+    return results
+
+if __name__ == "__main__":
+    # python rules.py rules.json [more.json ...] < listing.txt
+    from organizer import FILE_TYPES
+    ruleset = RuleSet(FILE_TYPES, merge_configs(load_config(p) for p in sys.argv[1:]))
+    for path, category, rule in test_rules(ruleset, (line.rstrip("\n") for line in sys.stdin if line.strip())):
+        print(f"{category}\t{rule}\t{path}")
@@ -0,0 +1,257 @@
+import os
+import time
+import hashlib
+import itertools
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Runs jobs for any number of users and folders on a fixed set of worker
+# threads. A job names the folders it touches; it only starts once it holds
+# an advisory lock on every one of them, so two jobs never work in the same
+# folder at once, in this process or in another organizer on the same box.
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# How often a job blocked by another process's lock looks again
+RETRY_INTERVAL = 1.0
+# Finished jobs kept around for the queue view
+KEEP_FINISHED = 200
+EXCLUSIVE = "exclusive"
+
+class FolderLocks:
+    # A folder is locked exclusively and every folder above it shared, so a
+    # job on /share and one on /share/team exclude each other while jobs on
+    # /share/a and /share/b don't
+    def __init__(self, lock_dir):
+        self.lock_dir = lock_dir
+        # key -> number of shared holds in this process, or EXCLUSIVE
+        self.held = {}
+        os.makedirs(lock_dir, exist_ok=True)
+
+    @staticmethod
+    def key(path):
+        return os.path.normcase(os.path.realpath(path))
+
+    @staticmethod
+    def ancestors(key):
+        parent = os.path.dirname(key)
+        while parent != key:
+            yield parent
+            key, parent = parent, os.path.dirname(parent)
+
+    def lock_path(self, key):
+        # Lock files live outside the folders so scans never see them
+        return os.path.join(self.lock_dir, hashlib.sha1(os.fsencode(key)).hexdigest()[:20] + ".lock")
+
+    def modes(self, paths):
+        # {key: exclusive?}; a folder that is also an ancestor of another stays exclusive
+        modes = {}
+        for path in paths:
+            key = self.key(path)
+            modes[key] = True
+            for parent in self.ancestors(key):
+                modes.setdefault(parent, False)
+        return modes
+
+    def acquire(self, paths):
+        # Non-blocking, all or nothing; returns the held locks or None
+        modes = sorted(self.modes(paths).items())
+        for key, exclusive in modes:
+            # flock also refuses a second descriptor in this process, this
+            # check is what keeps threads apart where there is no flock
+            current = self.held.get(key)
+            if current == EXCLUSIVE or (exclusive and current):
+                return None
+        held = []
+        for key, exclusive in modes:
+            fd = os.open(self.lock_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    self.release(held)
+                    return None
+            self.held[key] = EXCLUSIVE if exclusive else self.held.get(key, 0) + 1
+            held.append((key, fd))
+        return held
+
+    def release(self, held):
+        for key, fd in held:
+            current = self.held.get(key)
+            if current == EXCLUSIVE or current == 1:
+                del self.held[key]
+            elif current:
+                self.held[key] = current - 1
+            # Closing the descriptor drops the flock
+            os.close(fd)
+
+class Job:
+    def __init__(self, job_id, kind, user, folders, func, args, kwargs, progress=None, on_done=None):
+        self.id = job_id
+        self.kind = kind
+        self.user = user
+        self.folders = list(folders)
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        # Anything with snapshot(), for the queue view to show how far along it is
+        self.progress = progress
+        self.on_done = on_done
+        self.state = QUEUED
+        self.waiting = False
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "user": self.user,
+            "folders": self.folders,
+            "state": self.state,
+            # Queued behind a lock held by another job or process
+            "waiting": self.waiting,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+class JobScheduler:
+    def __init__(self, workers=4, lock_dir="locks", retry_interval=RETRY_INTERVAL):
+        self.locks = FolderLocks(lock_dir)
+        self.retry_interval = retry_interval
+        self.cond = threading.Condition()
+        self.queue = []
+        self.finished = []
+        self.running = []
+        self.ids = itertools.count(1)
+        self.stopping = False
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, kind, user, folders, func, *args, progress=None, on_done=None, **kwargs):
+        # on_done(job) runs on the worker thread once the job has finished or failed
+        with self.cond:
+            if self.stopping:
+                raise RuntimeError("Scheduler is shut down")
+            job = Job(next(self.ids), kind, user, folders, func, args, kwargs, progress, on_done)
+            self.queue.append(job)
+            self.cond.notify()
+        return job
+
+    def jobs(self):
+        with self.cond:
+            return self.finished + self.running + self.queue
+
+    def cancel(self, job_id):
+        # Only jobs that haven't started can be cancelled; on_done still runs
+        with self.cond:
+            job = next((job for job in self.queue if job.id == job_id), None)
+            if job is None:
+                return False
+            self.queue.remove(job)
+            job.state = CANCELLED
+            job.finished = time.time()
+            self.retire(job)
+        if job.on_done:
+            job.on_done(job)
+        return True
+
+    def hold(self, folders):
+        # Lock folders for work done outside the queue (watch mode); release() when done
+        with self.cond:
+            held = self.locks.acquire(folders)
+        return None if held is None else FolderHold(self, held)
+
+    def release(self, held):
+        with self.cond:
+            self.locks.release(held)
+            self.cond.notify_all()
+
+    def retire(self, job):
+        self.finished.append(job)
+        del self.finished[:-KEEP_FINISHED]
+
+    def next_job(self):
+        # First job in submission order whose folders are all free
+        for job in self.queue:
+            held = self.locks.acquire(job.folders)
+            if held is not None:
+                self.queue.remove(job)
+                job.waiting = False
+                return job, held
+            job.waiting = True
+        return None, None
+
+    def work(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.stopping and not self.queue:
+                        return
+                    job, held = self.next_job()
+                    if job is not None:
+                        break
+                    # Locks held in this process notify on release; other processes' don't
+                    self.cond.wait(self.retry_interval if self.queue else None)
+                job.state = RUNNING
+                job.started = time.time()
+                self.running.append(job)
+
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.state = DONE
+            except Exception as e:
+                job.error = e
+                job.state = FAILED
+            finally:
+                job.finished = time.time()
+                with self.cond:
+                    self.locks.release(held)
+                    self.running.remove(job)
+                    self.retire(job)
+                    self.cond.notify_all()
+            if job.on_done:
+                try:
+                    job.on_done(job)
+                except Exception:
+                    # A broken callback must not take the worker down with it
+                    pass
+
+    def shutdown(self, wait=True):
+        # Queued jobs still run; nothing new is accepted
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+class FolderHold:
+    def __init__(self, scheduler, held):
+        self.scheduler = scheduler
+        self.held = held
+
+    def release(self):
+        if self.held is not None:
+            self.scheduler.release(self.held)
+            self.held = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
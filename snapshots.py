@@ -0,0 +1,244 @@
+import os
+import json
+import errno
+import time
+import hashlib
+import shutil
+import itertools
+import threading
+import governor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Content-addressed backup store:
+#   <root>/objects/ab/abcdef...   one file per unique content hash
+#   <root>/snapshots/<id>.json    manifest describing one backup run
+#   <root>/seen.json              inode -> (size, mtime, hash) quick-check cache
+FICLONE = 0x40049409
+HASH_CHUNK = 1024 * 1024
+# Reads of a file that keeps changing under the backup before giving up on it
+STABLE_ATTEMPTS = 3
+
+def file_digest(path):
+    h = hashlib.sha256()
+    gov = governor.current()
+    with gov.operation(), open(path, "rb", buffering=0) as f:
+        # Charged by what's left, so the read that finds EOF costs no bytes
+        remaining = os.fstat(f.fileno()).st_size
+        while True:
+            with gov.io(max(0, min(HASH_CHUNK, remaining))):
+                chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            h.update(chunk)
+    return h.hexdigest()
+
+def same_version(before, after):
+    # ctime as well: it moves on every write, even one that puts mtime back
+    return ((before.st_ino, before.st_size, before.st_mtime_ns, before.st_ctime_ns)
+            == (after.st_ino, after.st_size, after.st_mtime_ns, after.st_ctime_ns))
+
+def reflink(src, dst):
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst, governor.current().io():
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+def copy_range(src, dst):
+    # copy_file_range lets the kernel (or an NFS 4.2 / SMB server) copy without
+    # bouncing the data through user space, and reflinks on btrfs/XFS
+    gov = governor.current()
+    if not hasattr(os, "copy_file_range"):
+        with gov.operation(), gov.io(os.stat(src).st_size):
+            shutil.copyfile(src, dst)
+        return
+    with gov.operation(), open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        chunk_size = gov.chunk(1 << 30)
+        try:
+            while remaining > 0:
+                with gov.io(min(remaining, chunk_size)):
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(remaining, chunk_size))
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            # Not supported between these filesystems, fall back to a plain copy
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            with gov.io(os.fstat(fsrc.fileno()).st_size):
+                shutil.copyfileobj(fsrc, fdst, HASH_CHUNK)
+
+def clone_file(src, dst, allow_hardlink=False):
+    if reflink(src, dst):
+        return "reflink"
+    # Hardlinks share the inode with the live file, so an in-place edit of the
+    # original would silently change the backup. Only used when asked for.
+    if allow_hardlink:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    copy_range(src, dst)
+    return "copy"
+
+class SnapshotStore:
+    def __init__(self, root, allow_hardlink=False):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self.seen_file = os.path.join(root, "seen.json")
+        self.allow_hardlink = allow_hardlink
+        self.seen = None
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def load_seen(self):
+        if self.seen is None:
+            try:
+                with open(self.seen_file, "r") as f:
+                    self.seen = json.load(f)
+            except (OSError, ValueError):
+                self.seen = {}
+        return self.seen
+
+    def save_seen(self):
+        tmp = f"{self.seen_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.seen, f)
+        os.replace(tmp, self.seen_file)
+
+    def add_file(self, path, st):
+        # (digest, stored a new object, stat of the version stored).
+        # Keyed by inode so files the organizer renamed are still recognised
+        seen = self.load_seen()
+        key = f"{st.st_dev}:{st.st_ino}"
+        cached = seen.get(key)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            digest = cached[2]
+            if os.path.exists(self.object_path(digest)):
+                return digest, False, st
+
+        # The file is hashed, then cloned: if it changed in between (or since
+        # the scan) the object wouldn't hold what its name says. Checked
+        # against a fresh stat afterwards, a changed file is read again.
+        for _ in range(STABLE_ATTEMPTS):
+            digest = file_digest(path)
+            obj_path = self.object_path(digest)
+            tmp = None
+            if not os.path.exists(obj_path):
+                os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                tmp = f"{obj_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                clone_file(path, tmp, self.allow_hardlink)
+            after = os.stat(path)
+            if same_version(st, after):
+                break
+            if tmp is not None:
+                os.remove(tmp)
+            st = after
+        else:
+            raise OSError(errno.EBUSY, "File kept changing during the backup", path)
+
+        seen[f"{st.st_dev}:{st.st_ino}"] = [st.st_size, st.st_mtime_ns, digest]
+        if tmp is None:
+            return digest, False, st
+        os.replace(tmp, obj_path)
+        return digest, True, st
+
+    def snapshot_ids(self):
+        base = time.strftime("%Y-%m-%d_%H-%M-%S")
+        yield base
+        for counter in itertools.count(1):
+            yield f"{base}_{counter}"
+
+    def create_snapshot(self, folder_path, entries, on_file=None):
+        # on_file(st, seconds) is called after each file, for progress reporting
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        folder_path = os.path.abspath(folder_path)
+        files = []
+        stored = 0
+        for path, st in entries:
+            started = time.perf_counter()
+            digest, new, st = self.add_file(path, st)
+            stored += new
+            if on_file:
+                on_file(st, time.perf_counter() - started)
+            rel_path = os.path.relpath(os.path.abspath(path), folder_path)
+            files.append([rel_path, digest, st.st_size, st.st_mtime_ns, st.st_mode & 0o7777])
+
+        manifest = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "folder": folder_path,
+            "stored": stored,
+            "files": files,
+        }
+        tmp = os.path.join(self.snapshots_dir, f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            for snapshot_id in self.snapshot_ids():
+                manifest["id"] = snapshot_id
+                with open(tmp, "w") as f:
+                    json.dump(manifest, f, separators=(",", ":"))
+                manifest_path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+                # link() fails if the name exists, so two backups in the same second can't collide
+                try:
+                    os.link(tmp, manifest_path)
+                    break
+                except FileExistsError:
+                    continue
+        finally:
+            os.remove(tmp)
+        if self.seen is not None:
+            self.save_seen()
+        return manifest_path
+
+    def list_snapshots(self):
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def load_manifest(self, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"), "r") as f:
+            return json.load(f)
+
+    def restore(self, snapshot_id, target=None):
+        manifest = self.load_manifest(snapshot_id)
+        target = target or manifest["folder"]
+        restored = 0
+        made_dirs = set()
+        for rel_path, digest, size, mtime_ns, mode in manifest["files"]:
+            dest = os.path.join(target, rel_path)
+            try:
+                st = os.stat(dest)
+                if st.st_size == size and st.st_mtime_ns == mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+
+            dest_dir = os.path.dirname(dest)
+            if dest_dir not in made_dirs:
+                os.makedirs(dest_dir, exist_ok=True)
+                made_dirs.add(dest_dir)
+            tmp = f"{dest}.restore.tmp"
+            # Never hardlink back out of the store, the object must stay immutable
+            if not reflink(self.object_path(digest), tmp):
+                copy_range(self.object_path(digest), tmp)
+            os.chmod(tmp, mode)
+            os.utime(tmp, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp, dest)
+            restored += 1
+        return restored
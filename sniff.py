@@ -0,0 +1,187 @@
+import os
+import json
+import threading
+import governor
+
+# Magic-byte type detection for files whose extension says nothing useful.
+# Only the first HEADER_BYTES of a file are read, once per (dev, inode,
+# size, mtime): results are kept in a probe cache between runs.
+HEADER_BYTES = 4096
+# Bumped whenever detection changes, so answers cached by an older table are dropped
+DETECT_VERSION = 2
+
+# (offset, magic, extension). The extension is looked up in the normal
+# extension map so custom categories apply to sniffed files too.
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", ".png"),
+    (0, b"GIF87a", ".gif"),
+    (0, b"GIF89a", ".gif"),
+    (0, b"II*\x00", ".tiff"),
+    (0, b"MM\x00*", ".tiff"),
+    (0, b"BM", ".bmp"),
+    (0, b"%PDF-", ".pdf"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".doc"),
+    (0, b"PK\x03\x04", ".zip"),
+    (0, b"Rar!\x1a\x07", ".rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", ".7z"),
+    (0, b"\x1f\x8b", ".gz"),
+    (257, b"ustar", ".tar"),
+    (0, b"ID3", ".mp3"),
+    (0, b"\xff\xfb", ".mp3"),
+    (0, b"\xff\xf3", ".mp3"),
+    (0, b"\xff\xf2", ".mp3"),
+    (0, b"fLaC", ".flac"),
+    (0, b"OggS", ".ogg"),
+    (0, b"\x1aE\xdf\xa3", ".mkv"),
+    (0, b"FLV\x01", ".flv"),
+    (0, b"0&\xb2u\x8ef\xcf\x11", ".wmv"),
+    (4, b"ftyp", ".mp4"),
+]
+
+# Containers whose sub-type is a second field further in
+RIFF_TYPES = {b"WAVE": ".wav", b"AVI ": ".avi", b"WEBP": ".webp"}
+# ISO base media files say what they are by brand, the major one or one of
+# the compatible brands after it. Specific brands are looked for first; the
+# generic ones (plain HEIF, plain ISO) only decide when nothing else does.
+FTYP_BRANDS = {
+    b"qt  ": ".mov", b"M4A ": ".m4a", b"M4B ": ".m4a",
+    b"heic": ".heic", b"heix": ".heic", b"heim": ".heic", b"heis": ".heic", b"hevc": ".heic", b"hevx": ".heic",
+    b"avif": ".avif", b"avis": ".avif",
+    b"mp41": ".mp4", b"mp42": ".mp4", b"avc1": ".mp4", b"M4V ": ".mp4",
+}
+FTYP_GENERIC = {b"mif1": ".heic", b"msf1": ".heic", b"isom": ".mp4", b"iso2": ".mp4"}
+ZIP_MARKERS = [(b"word/", ".docx"), (b"xl/", ".xlsx"), (b"ppt/", ".pptx")]
+
+def compile_signatures(signatures):
+    # Offset -> first byte -> candidates, longest magic first
+    table = {}
+    for offset, magic, ext in signatures:
+        table.setdefault(offset, {}).setdefault(magic[0], []).append((magic, ext))
+    for by_byte in table.values():
+        for candidates in by_byte.values():
+            candidates.sort(key=lambda c: -len(c[0]))
+    return table
+
+SIGNATURE_TABLE = compile_signatures(SIGNATURES)
+
+def read_header(path, size=HEADER_BYTES):
+    gov = governor.current()
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        with gov.operation(), gov.io(size):
+            if hasattr(os, "pread"):
+                return os.pread(fd, size, 0)
+            return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+def detect_header(header):
+    if header[:4] == b"RIFF":
+        return RIFF_TYPES.get(header[8:12])
+    for offset, by_byte in SIGNATURE_TABLE.items():
+        if len(header) <= offset:
+            continue
+        for magic, ext in by_byte.get(header[offset], ()):
+            if header.startswith(magic, offset):
+                if ext == ".mp4":
+                    return detect_ftyp(header)
+                if ext == ".zip":
+                    for marker, office_ext in ZIP_MARKERS:
+                        if marker in header:
+                            return office_ext
+                return ext
+    return detect_text(header)
+
+def detect_ftyp(header):
+    # Brands: major at 8, compatible ones from 16 to the end of the ftyp box
+    box_end = min(int.from_bytes(header[:4], "big"), len(header))
+    brands = [header[8:12]] + [header[i:i + 4] for i in range(16, box_end - 3, 4)]
+    for brand in brands:
+        if brand in FTYP_BRANDS:
+            return FTYP_BRANDS[brand]
+    for brand in brands:
+        if brand in FTYP_GENERIC:
+            return FTYP_GENERIC[brand]
+        if brand.startswith(b"3g"):
+            return ".mp4"
+    # Some other ISO media (a JPEG 2000, a CMAF segment...): unknown
+    return None
+
+def detect_text(header):
+    if not header or b"\x00" in header:
+        return None
+    try:
+        text = header.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multibyte character may be cut off at the end of the window
+        if len(header) < HEADER_BYTES or e.start < len(header) - 3:
+            return None
+        text = header[:e.start].decode("utf-8")
+    head = text.lstrip()[:256].lower()
+    if "<svg" in head:
+        return ".svg"
+    if sum(c.isprintable() or c in "\r\n\t" for c in text) < len(text) * 0.95:
+        return None
+    return ".txt"
+
+class ProbeCache:
+    # version: what produced the answers; a file written by another version,
+    # or by one that didn't record it, starts over empty
+    def __init__(self, path, version=DETECT_VERSION):
+        self.path = path
+        self.version = version
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") == version and isinstance(data.get("entries"), dict):
+            self.entries = data["entries"]
+        else:
+            self.entries = {}
+
+    @staticmethod
+    def key(st):
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+    def get(self, st):
+        return self.entries.get(self.key(st), False)
+
+    def put(self, st, ext):
+        with self.lock:
+            self.entries[self.key(st)] = ext
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": self.version, "entries": self.entries}, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+def sniff_file(path, st, cache=None):
+    if cache is not None:
+        cached = cache.get(st)
+        if cached is not False:
+            return cached
+    try:
+        ext = detect_header(read_header(path))
+    except OSError:
+        return None
+    if cache is not None:
+        cache.put(st, ext)
+    return ext
+
+def sniff_many(files, cache=None, workers=8):
+    # files: [(path, stat)] -> {path: extension or None}
+    if not files:
+        return {}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda item: sniff_file(item[0], item[1], cache), files)
+        return {path: ext for (path, _), ext in zip(files, results)}
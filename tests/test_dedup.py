@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import organizer
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def filed_copies(folder, name_prefix):
+    # Organized copies of the installer, wherever their category put them
+    return sorted(os.path.join(d, n) for d, _, names in os.walk(folder)
+                  for n in names if n.startswith(name_prefix) and d != folder)
+
+
+def test_skipped_duplicates_stay_skipped_across_runs(tmp_path, monkeypatch):
+    # The organizer keeps data/ in the working directory
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "Downloads"
+    folder.mkdir()
+    installer = os.urandom(300 * 1024)
+    write(folder / "setup.exe", installer)
+    write(folder / "setup (1).exe", installer)
+
+    organizer.organize_folder("tester", str(folder), dedup="skip")
+    assert len(filed_copies(str(folder), "setup")) == 1
+
+    # Same installer downloaded again, plus the copy left behind last time
+    write(folder / "setup (2).exe", installer)
+    for _ in range(2):
+        organizer.organize_folder("tester", str(folder), dedup="skip")
+        assert len(filed_copies(str(folder), "setup")) == 1
+    assert (folder / "setup (1).exe").exists()
+    assert (folder / "setup (2).exe").exists()
+
+
+def test_hardlinks_new_copy_to_one_organized_earlier(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "Downloads"
+    folder.mkdir()
+    data = os.urandom(200 * 1024)
+    write(folder / "photo.jpg", data)
+    organizer.organize_folder("tester", str(folder), dedup="hardlink")
+    (kept,) = filed_copies(str(folder), "photo")
+
+    write(folder / "photo copy.jpg", data)
+    organizer.organize_folder("tester", str(folder), dedup="hardlink")
+    (copy,) = filed_copies(str(folder), "photo copy")
+    assert os.path.samefile(kept, copy)
@@ -0,0 +1,130 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mover import MoveExecutor
+
+
+class FlippingFuture:
+    # Not done on the first done() call, done from then on: a copy that
+    # finishes while completed() is looking at the running list
+    def __init__(self, payload=None):
+        self.payload = payload
+        self.calls = 0
+
+    def done(self):
+        self.calls += 1
+        return self.calls > 1
+
+    def result(self):
+        # A copy returns its payload
+        return self.payload
+
+    def exception(self):
+        return None
+
+
+def test_completed_reports_copy_finishing_mid_check():
+    executor = MoveExecutor()
+    executor.running.append((FlippingFuture("copied"), "copied"))
+    reported = executor.completed() + executor.drain() + executor.finished()
+    assert reported == ["copied"]
+
+
+def test_completed_keeps_renames_when_a_copy_failed():
+    class Failed(FlippingFuture):
+        def done(self):
+            return True
+
+        def result(self):
+            raise OSError("copy failed")
+
+    executor = MoveExecutor()
+    executor.done.append("renamed")
+    executor.running.append((Failed(), "copy"))
+    try:
+        executor.completed()
+    except OSError:
+        pass
+    else:
+        raise AssertionError("the copy error was swallowed")
+    assert executor.finished() == ["renamed"]
+
+
+def test_source_deleted_after_planning_is_skipped(tmp_path, monkeypatch):
+    import organizer
+
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "Downloads"
+    folder.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (folder / name).write_text(name)
+    plan = organizer.plan_folder("tester", str(folder), create_dirs=True)
+    os.remove(folder / "b.txt")
+
+    summary, skipped = organizer.execute_plan("tester", plan, verify=False)
+    assert skipped == 1
+    assert sum(summary.values()) == 2
+    assert sorted(os.listdir(folder)) == ["Documents"]
+    run = organizer.list_runs("tester")[0]
+    assert run["state"] == "complete"
+    footer = organizer.journal.read_run(os.path.join(organizer.user_journal_dir("tester"), f"{run['run']}.jsonl"))[2]
+    assert footer["moved"] == 2
+
+
+def test_copy_of_deleted_source_is_vanished(tmp_path):
+    src = tmp_path / "gone.txt"
+    executor = MoveExecutor()
+    try:
+        assert executor.copy(str(src), str(tmp_path / "dest.txt"), "row") == "vanished"
+    finally:
+        executor.close()
+
+
+def test_name_taken_after_planning_is_not_overwritten(tmp_path, monkeypatch):
+    import organizer
+
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "Downloads"
+    folder.mkdir()
+    (folder / "a.txt").write_text("planned")
+    plan = organizer.plan_folder("tester", str(folder), create_dirs=True)
+    planned = plan.row(0)[1]
+    # Another program saves a file under the planned name before the run
+    with open(planned, "w") as f:
+        f.write("theirs")
+
+    summary, skipped = organizer.execute_plan("tester", plan, verify=False)
+    assert summary == {"Documents": 1}
+    with open(planned) as f:
+        assert f.read() == "theirs"
+    moved = os.path.join(os.path.dirname(planned), "a_1.txt")
+    with open(moved) as f:
+        assert f.read() == "planned"
+
+    # The journal names where the file really went, so undo leaves theirs alone
+    run = organizer.list_runs("tester")[0]
+    organizer.undo_run("tester", run["run"])
+    assert (folder / "a.txt").read_text() == "planned"
+    with open(planned) as f:
+        assert f.read() == "theirs"
+
+
+def test_copy_takes_next_name_instead_of_replacing(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_text("mine")
+    taken = tmp_path / "dest.txt"
+    taken.write_text("theirs")
+    claimed = []
+    executor = MoveExecutor(next_name=lambda src, dest, payload: (dest + ".1", dest + ".1"),
+                            on_claim=lambda src, dest: claimed.append(dest))
+    try:
+        assert executor.copy(str(src), str(taken), str(taken)) == str(taken) + ".1"
+    finally:
+        executor.close()
+    assert taken.read_text() == "theirs"
+    assert (tmp_path / "dest.txt.1").read_text() == "mine"
+    assert claimed == [str(taken) + ".1"]
+    assert not src.exists()
+    assert sorted(os.listdir(tmp_path)) == ["dest.txt", "dest.txt.1"]
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plan import MovePlan, diff_plans
+
+
+def make_plan(moves):
+    plan = MovePlan("/d")
+    for i, (src, dest) in enumerate(moves):
+        plan.add(src, dest, "Documents", 10, 1000, i)
+    return plan
+
+
+def test_diff_plans_merges_sources():
+    old = make_plan([("/d/a.txt", "/d/Documents/a.txt"), ("/d/b.txt", "/d/Documents/b.txt"),
+                     ("/d/c.txt", "/d/Documents/c.txt")])
+    new = make_plan([("/d/b.txt", "/d/Documents/b_1.txt"), ("/d/c.txt", "/d/Documents/c.txt"),
+                     ("/d/d.txt", "/d/Documents/d.txt")])
+    diff = diff_plans(old, new)
+    assert [row[0] for row in diff["added"]] == ["/d/d.txt"]
+    assert [row[0] for row in diff["removed"]] == ["/d/a.txt"]
+    assert diff["changed"] == [("/d/b.txt", "/d/Documents/b.txt", "/d/Documents/b_1.txt")]
+
+
+def test_unsorted_plan_saves_and_diffs_in_source_order(tmp_path):
+    plan = make_plan([("/d/z.txt", "/d/Documents/z.txt"), ("/d/a.txt", "/d/Documents/a.txt")])
+    path = str(tmp_path / "moves.plan")
+    plan.save(path)
+    loaded = MovePlan.load(path)
+    assert [row[0] for row in loaded] == ["/d/a.txt", "/d/z.txt"]
+    assert diff_plans(plan, loaded) == {"added": [], "removed": [], "changed": []}
@@ -0,0 +1,26 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import RuleSet, DAY
+
+
+def test_leading_global_flags_apply_to_their_rule():
+    rules = RuleSet({"Images": [".png"]}, {"rules": [
+        {"category": "Screenshots", "regex": "(?i)screen.*\\.png"},
+        {"category": "Logs", "regex": "log\\d+\\.txt"},
+    ]})
+    assert rules.classify("SCREEN 1.PNG") == "Screenshots"
+    # The flag is scoped to its rule, not the whole alternation
+    assert rules.classify("LOG1.TXT") == "Others"
+    assert rules.classify("log1.txt") == "Logs"
+
+
+def test_age_is_measured_when_classifying():
+    rules = RuleSet({}, {"rules": [{"category": "Archive", "older_than_days": 1}]})
+    st = SimpleNamespace(st_size=1, st_mtime=1000.0)
+    assert rules.classify("a.txt", st, now=1000.0) == "Others"
+    # Same RuleSet a few days on, as in a long watch session
+    assert rules.classify("a.txt", st, now=1000.0 + 3 * DAY) == "Archive"
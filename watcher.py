@@ -0,0 +1,151 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Linux inotify through ctypes, no third-party dependency.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# Browsers and downloaders write to these and rename to the final name when done
+PARTIAL_SUFFIXES = (".part", ".partial", ".crdownload", ".download")
+
+def load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+def file_signature(st):
+    return st.st_size, st.st_mtime_ns
+
+class FolderWatcher:
+    # Yields batches of files in one directory once they have stopped changing.
+    # Blocks in poll() while nothing happens, so an idle folder costs no CPU.
+    def __init__(self, folder_path, settle=0.5, ignore=lambda name: False):
+        libc = load_libc()
+        if libc is None:
+            raise RuntimeError("Watch mode needs Linux inotify")
+        self.folder_path = folder_path
+        self.settle = settle
+        self.ignore = ignore
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(folder_path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, os.strerror(err), folder_path)
+
+        # stop() writes to this pipe to wake the blocking poll
+        self.wake_r, self.wake_w = os.pipe()
+        self.stopped = False
+        self.pending = {}
+
+    def stop(self):
+        self.stopped = True
+        try:
+            os.write(self.wake_w, b"x")
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.fd, self.wake_r, self.wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def schedule(self, name):
+        if self.ignore(name) or name.endswith(PARTIAL_SUFFIXES):
+            return
+        try:
+            signature = file_signature(os.stat(os.path.join(self.folder_path, name)))
+        except FileNotFoundError:
+            return
+        # Every new event for the same name pushes its deadline out again
+        self.pending[name] = [time.monotonic() + self.settle, signature]
+
+    def schedule_all(self):
+        # Event queue overflowed: fall back to listing the folder once
+        with os.scandir(self.folder_path) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    self.schedule(entry.name)
+
+    def read_events(self):
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.schedule_all()
+                elif mask & IN_IGNORED:
+                    # Watched folder itself went away
+                    self.stopped = True
+                elif name and not mask & IN_ISDIR:
+                    self.schedule(os.fsdecode(name))
+
+    def ready(self):
+        now = time.monotonic()
+        batch = []
+        for name, slot in list(self.pending.items()):
+            if slot[0] > now:
+                continue
+            path = os.path.join(self.folder_path, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[name]
+                continue
+            signature = file_signature(st)
+            if slot[1] != signature:
+                # Still being written to, check again after another settle period
+                slot[:] = [now + self.settle, signature]
+                continue
+            del self.pending[name]
+            batch.append((path, st))
+        return batch
+
+    def batches(self):
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        poller.register(self.wake_r, select.POLLIN)
+        while not self.stopped:
+            if self.pending:
+                timeout = max(0, min(slot[0] for slot in self.pending.values()) - time.monotonic()) * 1000
+            else:
+                timeout = None
+            for fd, _ in poller.poll(timeout):
+                if fd == self.fd:
+                    self.read_events()
+            if self.stopped:
+                break
+            batch = self.ready()
+            if batch:
+                yield batch